@@ -231,11 +231,11 @@ void processTemperature() {
   float amb = mlx.readAmbientTempC();
   float obj = mlx.readObjectTempC();
 
-  Serial.println("[TEMP]");
-  Serial.print("DHT="); Serial.println(t);
-  Serial.print("HUM="); Serial.println(h);
-  Serial.print("AMB="); Serial.println(amb);
-  Serial.print("OBJ="); Serial.println(obj);
+  // one line per reading set; the hub still accepts the older one-field-per-line block
+  Serial.print("[TEMP]DHT="); Serial.print(t);
+  Serial.print(";HUM="); Serial.print(h);
+  Serial.print(";AMB="); Serial.print(amb);
+  Serial.print(";OBJ="); Serial.print(obj);
   Serial.println("[/TEMP]");
 }
 
@@ -2,13 +2,29 @@
 #!/usr/bin/env python3
 
 import threading
+import queue
 import serial
+import selectors
+import os
+import re
 import time
 import cv2
 import numpy as np
 import sys
 import math
-from collections import deque
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # numba is optional; without it the jitted helpers run as plain Python
+    NUMBA_AVAILABLE = False
+    prange = range
+    def njit(*args, **kwargs):
+        if args and callable(args[0]): return args[0]
+        return lambda fn: fn
 try:
     from picamera2 import Picamera2
 except ImportError:
@@ -22,12 +38,32 @@ SMOOTHING_REQUIRED = 5
 SMOOTHING_MIN_CONF = 0.5
 
 # ---------------- SensorReader (optional) ----------------
+# [TEMP] block is four positional KEY=value fields (DHT, HUM, AMB, OBJ) closed by [/TEMP];
+# older firmware puts one field per line, current firmware sends [TEMP]DHT=..;HUM=..;AMB=..;OBJ=..[/TEMP]
+_TEMP_FIELDS = ("dht_temp", "humidity", "mlx_ambient", "mlx_object")
+_TEMP_SEP = re.compile(rb"[;\s]+")
+_MAX_PENDING = 4096
+
+def _to_float(raw):
+    try: return float(raw)
+    except ValueError: return None
+
+def _temp_values(body):
+    """Per-field floats of a [TEMP] body; a field that is missing or unparsable is None on its own."""
+    fields = [f for f in _TEMP_SEP.split(body) if f]
+    values = []
+    for i in range(len(_TEMP_FIELDS)):
+        key, eq, raw = fields[i].partition(b"=") if i < len(fields) else (b"", b"", b"")
+        values.append(_to_float(raw) if eq else None)
+    return values
+
 class SensorReader:
     def __init__(self, port="/dev/ttyUSB0", baud=115200, reconnect_interval=2.0):
         self.port = port; self.baud = baud; self.reconnect_interval = reconnect_interval
         self._stop = threading.Event(); self._thread = None; self._lock = threading.Lock()
         self.dht_temp = None; self.humidity = None; self.mlx_ambient = None; self.mlx_object = None
         self.rfid1 = None; self.rfid2 = None; self.last_update = None; self._ser = None
+        self._sel = None; self._buf = bytearray()
 
     def start(self):
         if self._thread and self._thread.is_alive(): return
@@ -43,25 +79,57 @@ class SensorReader:
             self._ser = serial.Serial(self.port, self.baud, timeout=1)
             try: self._ser.reset_input_buffer()
             except Exception: pass
+            self._sel = selectors.DefaultSelector(); self._sel.register(self._ser.fileno(), selectors.EVENT_READ)
+            self._buf = bytearray()
             return True
         except Exception:
             self._ser = None; return False
 
     def _close_serial(self):
         try:
-            if self._ser: self._ser.close()
+            if self._sel: self._sel.close()
         except Exception:
             pass
-        self._ser = None
-
-    def _safe_readline(self):
         try:
-            if not self._ser: return ""
-            raw = self._ser.readline()
-            if not raw: return ""
-            return raw.decode("utf-8", errors="ignore").strip()
+            if self._ser: self._ser.close()
         except Exception:
-            return ""
+            pass
+        self._ser = None; self._sel = None
+
+    def _read_chunk(self, timeout=1.0):
+        # wait on the fd ourselves and pull whatever is buffered in one read
+        if not self._sel.select(timeout): return False
+        chunk = os.read(self._ser.fileno(), 4096)
+        if not chunk: raise serial.SerialException("serial device returned no data (disconnected?)")
+        self._buf += chunk
+        return True
+
+    def _process_buffer(self):
+        buf = self._buf
+        while True:
+            nl = buf.find(b"\n")
+            if nl == -1: return
+            if buf.startswith(b"[TEMP]"):
+                # the close tag must come before the next block's header, else this block was never closed
+                nxt = buf.find(b"[TEMP]", 6)
+                end = buf.find(b"[/TEMP]", 6, len(buf) if nxt == -1 else nxt)
+                if end == -1:
+                    if nxt == -1 and len(buf) < _MAX_PENDING: return
+                    del buf[:nl+1]; continue   # drop only the header; the lines after it are parsed normally
+                values = _temp_values(bytes(buf[6:end]))
+                del buf[:end + len(b"[/TEMP]")]
+                with self._lock:
+                    for name, v in zip(_TEMP_FIELDS, values):
+                        if v is not None: setattr(self, name, v)
+                    self.last_update = time.time()
+                continue
+            line = buf[:nl].decode("utf-8", errors="ignore").strip(); del buf[:nl+1]
+            if line.startswith("[RFID1] UID="):
+                uid = line.replace("[RFID1] UID=","").strip()
+                with self._lock: self.rfid1 = uid; self.last_update = time.time()
+            elif line.startswith("[RFID2] UID="):
+                uid = line.replace("[RFID2] UID=","").strip()
+                with self._lock: self.rfid2 = uid; self.last_update = time.time()
 
     def _run(self):
         while not self._stop.is_set():
@@ -71,38 +139,8 @@ class SensorReader:
                     time.sleep(self.reconnect_interval)
                     continue
             try:
-                line = self._safe_readline()
-                if not line:
-                    time.sleep(0.01); continue
-                if line == "[TEMP]":
-                    l1 = self._safe_readline(); l2 = self._safe_readline(); l3 = self._safe_readline(); l4 = self._safe_readline()
-                    _end = self._safe_readline()
-                    dht=None; hum=None; amb=None; obj=None
-                    if "=" in l1:
-                        try: dht = float(l1.split("=",1)[1])
-                        except Exception: dht=None
-                    if "=" in l2:
-                        try: hum = float(l2.split("=",1)[1])
-                        except Exception: hum=None
-                    if "=" in l3:
-                        try: amb = float(l3.split("=",1)[1])
-                        except Exception: amb=None
-                    if "=" in l4:
-                        try: obj = float(l4.split("=",1)[1])
-                        except Exception: obj=None
-                    with self._lock:
-                        if dht is not None: self.dht_temp = dht
-                        if hum is not None: self.humidity = hum
-                        if amb is not None: self.mlx_ambient = amb
-                        if obj is not None: self.mlx_object = obj
-                        self.last_update = time.time()
-                elif line.startswith("[RFID1] UID="):
-                    uid = line.replace("[RFID1] UID=","").strip()
-                    with self._lock: self.rfid1 = uid; self.last_update = time.time()
-                elif line.startswith("[RFID2] UID="):
-                    uid = line.replace("[RFID2] UID=","").strip()
-                    with self._lock: self.rfid2 = uid; self.last_update = time.time()
-            except serial.SerialException:
+                if self._read_chunk(): self._process_buffer()
+            except (serial.SerialException, OSError):
                 self._close_serial(); time.sleep(self.reconnect_interval)
             except Exception:
                 time.sleep(0.01)
@@ -125,18 +163,71 @@ def initialize_camera():
     """Initializes and returns a Picamera2 object."""
     try:
         picam2 = Picamera2()
-        config = picam2.create_preview_configuration(main={"size": (640, 480), "format": "XRGB8888"})
+        # planar YUV420 is 1.5 bytes/pixel against 4 for XRGB8888
+        config = picam2.create_preview_configuration(main={"size": (640, 480), "format": "YUV420"})
         picam2.configure(config)
         picam2.start()
         return picam2
     except Exception as e:
         return None
 
+def _bgr_converter(picam2):
+    """Picks the raw->BGR step for the configured main stream once, instead of per frame.
+    RGB888 and XRGB8888 are already B,G,R(,X) in memory, so the latter only drops its padding byte;
+    XBGR8888 is R,G,B,X and needs a real channel swap."""
+    try: fmt = picam2.camera_config["main"]["format"]
+    except Exception: fmt = "YUV420"
+    if fmt == "YUV420": return lambda raw: cv2.cvtColor(raw, cv2.COLOR_YUV2BGR_I420)
+    if fmt == "RGB888": return lambda raw: raw
+    if fmt == "XRGB8888": return lambda raw: raw[:, :, :3]
+    if fmt == "XBGR8888": return lambda raw: cv2.cvtColor(raw, cv2.COLOR_RGBA2BGR)
+    raise ValueError(f"unsupported main stream format {fmt}")
+
+def capture_frame(picam2):
+    """Captures one frame and returns it as a BGR image."""
+    return _bgr_converter(picam2)(picam2.capture_array())
+
+class FrameGrabber:
+    """Captures on a background thread so camera readout overlaps frame processing."""
+    def __init__(self, picam2, maxsize=2):
+        self.picam2 = picam2; self._q = queue.Queue(maxsize=maxsize)
+        self._to_bgr = _bgr_converter(picam2)
+        self._stop = threading.Event(); self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._stop.clear(); self._thread = threading.Thread(target=self._run, daemon=True); self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try: raw = self.picam2.capture_array()
+            except Exception:
+                time.sleep(0.01); continue
+            # keep latency bounded: a full queue drops its oldest frame
+            try: self._q.put_nowait(raw)
+            except queue.Full:
+                try: self._q.get_nowait()
+                except queue.Empty: pass
+                self._q.put_nowait(raw)
+
+    def get(self, timeout=2.0):
+        """Returns the oldest queued frame as BGR; raises queue.Empty if the camera stalls."""
+        return self._to_bgr(self._q.get(timeout=timeout))
+
 # ---------------- Detection config (tuned ~30cm) ----------------
 roi_scale = 0.30
-min_area = 250      
+min_area = 300      # no median blur before contouring; the area floor rejects the leftover specks
 use_gamma = True
 center_only_mode = False
+# route per-pixel kernels through cv2.UMat; opt-in (USE_OPENCL=true) since an iGPU round trip often
+# loses to the CPU on ROI-sized frames
+use_opencl = os.environ.get('USE_OPENCL', 'false').lower() == 'true' and cv2.ocl.haveOpenCL()
+use_fused_hsv = False   # one parallel numba pass for gamma + BGR->HSV; needs numba, pays off with several cores
+roi_change_threshold = 3.0   # mean abs diff (0-255) below which the last detection is reused
 
 color_map = {
     "Red1":    ([0, 10],    [100, 255], [100, 255]),
@@ -152,79 +243,217 @@ color_map = {
 }
 
 # ---------------- Utilities ----------------
+@njit(cache=True)
 def bbox_intersection(a,b):
     ax1,ay1,ax2,ay2 = a; bx1,by1,bx2,by2 = b
     ix1,iy1 = max(ax1,bx1), max(ay1,by1); ix2,iy2 = min(ax2,bx2), min(ay2,by2)
     if ix2<=ix1 or iy2<=iy1: return 0
     return (ix2-ix1)*(iy2-iy1)
 
-def preprocess(frame):
-    img = frame.copy()
-    if use_gamma:
-        gamma = 1.2; inv = 1.0/gamma
-        table = (np.linspace(0,1,256)**inv * 255).astype(np.uint8)
-        img = cv2.LUT(img, table)
-    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-    h,s,v = cv2.split(hsv)
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    v = clahe.apply(v)
-    hsv = cv2.merge([h,s,v])
+@njit(cache=True)
+def _pick_contour(areas, bboxes, inside, roi_box, roi_fallback_overlap):
+    """Returns (best_center_idx, best_overlap_idx); -1 where nothing qualifies."""
+    best_center = -1; best_overlap = -1
+    for i in range(areas.shape[0]):
+        if inside[i]:
+            if best_center < 0 or areas[i] > areas[best_center]: best_center = i
+            continue
+        if roi_fallback_overlap:
+            x, y, w, h = bboxes[i, 0], bboxes[i, 1], bboxes[i, 2], bboxes[i, 3]
+            if bbox_intersection((x, y, x + w, y + h), roi_box) > 0:
+                if best_overlap < 0 or areas[i] > areas[best_overlap]: best_overlap = i
+    return best_center, best_overlap
+
+def _masked_argmax(values, mask):
+    if not mask.any(): return -1
+    return int(np.argmax(np.where(mask, values, -np.inf)))
+
+def _pick_contour_np(areas, bboxes, inside, roi_box, roi_fallback_overlap):
+    """NumPy equivalent of _pick_contour, used when numba is not installed."""
+    best_center = _masked_argmax(areas, inside); best_overlap = -1
+    if roi_fallback_overlap:
+        x1,y1,x2,y2 = roi_box; bx,by = bboxes[:,0], bboxes[:,1]
+        inter_w = np.minimum(bx + bboxes[:,2], x2) - np.maximum(bx, x1)
+        inter_h = np.minimum(by + bboxes[:,3], y2) - np.maximum(by, y1)
+        best_overlap = _masked_argmax(areas, ~inside & (inter_w > 0) & (inter_h > 0))
+    return best_center, best_overlap
+
+if not NUMBA_AVAILABLE: _pick_contour = _pick_contour_np
+
+GAMMA = 1.2
+_GAMMA_LUT = (np.linspace(0,1,256)**(1.0/GAMMA) * 255).astype(np.uint8)
+_IDENTITY_LUT = np.arange(256, dtype=np.uint8)
+_CLAHE = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+# OpenCV's fixed-point BGR2HSV divisor tables (hsv_shift = 12), so the fused kernel matches cvtColor
+_HSV_SDIV = np.array([0] + [np.rint((255 << 12) / i) for i in range(1, 256)], np.int32)
+_HSV_HDIV = np.array([0] + [np.rint((180 << 12) / (6.0 * i)) for i in range(1, 256)], np.int32)
+
+@njit(parallel=True, fastmath=True, nogil=True, cache=True)
+def _fused_gamma_bgr2hsv(frame, lut, sdiv, hdiv, img, hsv):
+    """Gamma LUT + BGR->HSV in one read of each pixel; rows are split across cores."""
+    for yy in prange(frame.shape[0]):
+        for xx in range(frame.shape[1]):
+            b = np.int32(lut[frame[yy, xx, 0]]); g = np.int32(lut[frame[yy, xx, 1]]); r = np.int32(lut[frame[yy, xx, 2]])
+            img[yy, xx, 0] = b; img[yy, xx, 1] = g; img[yy, xx, 2] = r
+            v = max(b, g, r); diff = v - min(b, g, r)
+            if v == r: h = g - b
+            elif v == g: h = b - r + 2 * diff
+            else: h = r - g + 4 * diff
+            h = (h * hdiv[diff] + 2048) >> 12
+            if h < 0: h += 180
+            hsv[yy, xx, 0] = h; hsv[yy, xx, 1] = (diff * sdiv[v] + 2048) >> 12; hsv[yy, xx, 2] = v
+
+class FrameBuffers:
+    """Scratch arrays for preprocess/get_masks/mask_preview(out=...), sized to one ROI shape.
+    fit() reallocates only when that shape changes, so the steady-state loop allocates nothing."""
+    __slots__ = ("shape", "img", "hsv", "bits", "tmp", "union", "masks")
+    def __init__(self): self.shape = None
+
+    def fit(self, shape):
+        h, w = shape[:2]
+        if self.shape != (h, w):
+            self.shape = (h, w)
+            self.img = np.empty((h, w, 3), np.uint8); self.hsv = np.empty((h, w, 3), np.uint8)
+            self.bits = np.empty((h, w), np.uint16); self.tmp = np.empty((h, w), np.uint16)
+            self.union = np.empty((h, w), np.uint8)
+            self.masks = {label: np.empty((h, w), np.uint8) for label, _ in _LABEL_BITS}
+        return self
+
+def preprocess(frame, out=None, need_img=True):
+    if use_opencl:
+        # T-API path: the same kernels dispatch to the OpenCL device; UMat has no plane views,
+        # so move just the V plane out and back instead of a full split/merge
+        u = cv2.UMat(frame)
+        if use_gamma: u = cv2.LUT(u, _GAMMA_LUT)
+        hsv = cv2.cvtColor(u, cv2.COLOR_BGR2HSV)
+        cv2.insertChannel(_CLAHE.apply(cv2.extractChannel(hsv, 2)), hsv, 2)
+        # each .get() is a device->host copy, so skip the image when the caller drops it
+        return (u.get() if need_img else None), hsv.get()
+    if out is not None: out.fit(frame.shape)
+    if use_fused_hsv and NUMBA_AVAILABLE:
+        img, hsv = (out.img, out.hsv) if out is not None else (np.empty_like(frame), np.empty_like(frame))
+        _fused_gamma_bgr2hsv(frame, _GAMMA_LUT if use_gamma else _IDENTITY_LUT, _HSV_SDIV, _HSV_HDIV, img, hsv)
+    elif out is not None:
+        img = cv2.LUT(frame, _GAMMA_LUT, dst=out.img) if use_gamma else frame
+        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV, dst=out.hsv)
+    else:
+        img = cv2.LUT(frame, _GAMMA_LUT) if use_gamma else frame
+        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    hsv[:,:,2] = _CLAHE.apply(hsv[:,:,2])
     return img, hsv
 
-def get_masks(hsv):
-    masks = {}
-    for cname, ((hl, hh), (sl, sh), (vl, vh)) in color_map.items():
-        mask = cv2.inRange(hsv, (hl, sl, vl), (hh, sh, vh))
-        if cname == "Red1":
-            masks["Red"] = mask.copy()
-        elif cname == "Red2":
-            masks["Red"] = cv2.bitwise_or(masks.get("Red", np.zeros_like(mask)), mask)
-        else:
-            masks[cname] = mask
-    return masks
-
-def shape_of(cnt):
-    area = cv2.contourArea(cnt)
+# color_map bounds as (N,3) HSV arrays, row i = color_map entry i
+COLOR_NAMES = tuple(color_map)
+COLOR_LOS = np.array([[hl, sl, vl] for (hl, _), (sl, _), (vl, _) in color_map.values()], dtype=np.uint8)
+COLOR_HIS = np.array([[hh, sh, vh] for (_, hh), (_, sh), (_, vh) in color_map.values()], dtype=np.uint8)
+
+def _build_color_luts():
+    # one bit per color_map entry; a pixel is in range i iff bit i survives H & S & V
+    luts = np.zeros((3, 256), np.uint16)
+    label_bits = {}
+    for i, name in enumerate(COLOR_NAMES):
+        for ch in range(3): luts[ch, COLOR_LOS[i, ch]:int(COLOR_HIS[i, ch])+1] |= np.uint16(1 << i)
+        label = "Red" if name in ("Red1", "Red2") else name
+        label_bits[label] = label_bits.get(label, 0) | (1 << i)
+    return luts[0], luts[1], luts[2], tuple((label, np.uint16(b)) for label, b in label_bits.items())
+
+_H_LUT, _S_LUT, _V_LUT, _LABEL_BITS = _build_color_luts()
+
+def get_masks(hsv, out=None):
+    """Per-label 0/255 masks; with `out` (a FrameBuffers) they overwrite its arrays and stay valid until the next call."""
+    if out is None:
+        bits = _H_LUT[hsv[:,:,0]] & _S_LUT[hsv[:,:,1]] & _V_LUT[hsv[:,:,2]]
+        return {label: ((bits & b) != 0).view(np.uint8) * 255 for label, b in _LABEL_BITS}
+    out.fit(hsv.shape); bits, tmp = out.bits, out.tmp
+    # mode="clip" lets take() write straight into out; uint8 indices never reach the clip
+    np.take(_H_LUT, hsv[:,:,0], out=bits, mode="clip")
+    np.take(_S_LUT, hsv[:,:,1], out=tmp, mode="clip"); np.bitwise_and(bits, tmp, out=bits)
+    np.take(_V_LUT, hsv[:,:,2], out=tmp, mode="clip"); np.bitwise_and(bits, tmp, out=bits)
+    for label, b in _LABEL_BITS:
+        m = out.masks[label]
+        np.bitwise_and(bits, b, out=tmp); np.not_equal(tmp, 0, out=m.view(np.bool_)); m *= 255
+    return out.masks
+
+def mask_preview(masks, scale=4, out=None):
+    """Union of the color masks shrunk by `scale`; INTER_AREA keeps any cell with a colored pixel non-zero."""
+    mask_iter = iter(masks.values()); first = next(mask_iter)
+    if out is None: union = first.copy()
+    else: union = out.fit(first.shape).union; np.copyto(union, first)
+    for m in mask_iter: np.bitwise_or(union, m, out=union)
+    h, w = union.shape
+    return cv2.resize(union, (max(1, w // scale), max(1, h // scale)), interpolation=cv2.INTER_AREA)
+
+def mask_too_sparse(preview, min_area, scale=4):
+    """True when the preview holds too few colored pixels for any blob to reach min_area.
+    Uses half of min_area so the open + dilate in choose_best_contour cannot grow a blob past it."""
+    return cv2.countNonZero(preview) * scale * scale < min_area // 2
+
+def shape_of(cnt, area=None, bbox=None):
+    """Classifies a contour; pass the area/bbox from choose_best_contour to skip recomputing them."""
+    if area is None: area = cv2.contourArea(cnt)
     if area <= 0: return "Unknown"
-    peri = cv2.arcLength(cnt, True)
-    approx = cv2.approxPolyDP(cnt, 0.02 * peri, True)
-    v = len(approx)
-    x, y, w, h = cv2.boundingRect(approx)
-    ar = w / float(h) if h > 0 else 999.0
+    x, y, w, h = bbox if bbox is not None else cv2.boundingRect(cnt)
+    if w>5*h or h>5*w: return "Rectangle"
     rectangularity = area / (w * h) if w * h > 0 else 0
-    if v == 4 or (v > 4 and rectangularity > 0.85) or (w>5*h or h>5*w): return "Rectangle"
+    if rectangularity > 0.85: return "Rectangle"
+    peri = cv2.arcLength(cnt, True)
     circularity = (4.0 * np.pi * area) / (peri * peri) if peri > 0 else 0
+    # no quadrilateral is rounder than a square (pi/4), so clearly round blobs skip the polygon fit
+    if circularity > 0.85: return "Circle"
+    if len(cv2.approxPolyDP(cnt, 0.02 * peri, True)) == 4: return "Rectangle"
     if circularity > 0.67: return "Circle"
     return "Oval"
 
+_KERNEL3 = np.ones((3,3), np.uint8)
+# OpenCV drops the GIL inside its kernels, so per-color contouring runs in parallel
+_CONTOUR_POOL = ThreadPoolExecutor(max_workers=4)
+
+def _color_contours(label, mask, combined_mask, center, min_area):
+    """Contours of one color that pass min_area, as [(label, contour, centroid, area, bbox, on_center)]."""
+    cx,cy = center
+    mask = cv2.bitwise_and(combined_mask, mask)
+    # O(1) stand-in for a polygon test: is the centre pixel itself this color
+    hit = 0 <= cy < mask.shape[0] and 0 <= cx < mask.shape[1] and mask[cy, cx] != 0
+    cnts,_ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    out = []
+    for c in cnts:
+        area = cv2.contourArea(c)
+        if area < min_area: continue
+        M = cv2.moments(c)
+        if M["m00"] == 0: continue
+        out.append((label, c, (int(M["m10"]/M["m00"]), int(M["m01"]/M["m00"])), area, cv2.boundingRect(c), hit))
+    return out
+
 def choose_best_contour(center, roi_box, masks, min_area, roi_fallback_overlap=True):
     cx,cy = center; x1,y1,x2,y2 = roi_box
-    best_center=None; best_overlap=None; combined_mask=None
-    for cname, mask in masks.items():
-        mask = cv2.medianBlur(mask,5)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3,3), np.uint8))
-        mask = cv2.dilate(mask, np.ones((3,3), np.uint8), iterations=1)
-        if combined_mask is None: combined_mask = mask 
-        else: combined_mask = cv2.bitwise_or(combined_mask, mask)
-        cnts,_ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        for c in cnts:
-            area = cv2.contourArea(c)
-            if area < min_area: continue
-            M = cv2.moments(c)
-            if M["m00"] == 0: continue
-            ccx,ccy = int(M["m10"]/M["m00"]), int(M["m01"]/M["m00"])
-            label = "Red" if cname in ("Red1","Red2") else cname
-            if cv2.pointPolygonTest(c, (cx,cy), False) >= 0:
-                if best_center is None or area > best_center[0]: best_center = (area, label, c, (ccx,ccy))
-                continue
-            if roi_fallback_overlap:
-                x,y,w,h = cv2.boundingRect(c)
-                inter = bbox_intersection((x,y,x+w,y+h),(x1,y1,x2,y2))
-                if inter > 0:
-                    if best_overlap is None or area > best_overlap[4]: best_overlap = (inter, label, c, (ccx,ccy), area)
-    if best_center: return best_center[1], best_center[2], best_center[3], best_center[0], combined_mask
-    if best_overlap: return best_overlap[1], best_overlap[2], best_overlap[3], best_overlap[4], combined_mask
-    return None, None, None, None, combined_mask
+    # denoise the union once; each color keeps only its pixels that survive the cleanup
+    mask_iter = iter(masks.values()); combined_mask = next(mask_iter).copy()
+    for m in mask_iter: np.bitwise_or(combined_mask, m, out=combined_mask)
+    if use_opencl:
+        u = cv2.morphologyEx(cv2.UMat(combined_mask), cv2.MORPH_OPEN, _KERNEL3)
+        combined_mask = cv2.dilate(u, _KERNEL3, iterations=1).get()   # findContours is CPU-only
+    else:
+        combined_mask = cv2.morphologyEx(combined_mask, cv2.MORPH_OPEN, _KERNEL3)
+        combined_mask = cv2.dilate(combined_mask, _KERNEL3, iterations=1)
+    futures = [_CONTOUR_POOL.submit(_color_contours, label, mask, combined_mask, center, min_area) for label, mask in masks.items()]
+    cands = []; areas = []; bboxes = []; on_center = []
+    for f in futures:
+        for label, c, centroid, area, bbox, hit in f.result():
+            cands.append((label, c, centroid)); areas.append(area); bboxes.append(bbox); on_center.append(hit)
+    if not cands: return None, None, None, None, None, combined_mask
+    areas = np.array(areas, np.float64); bboxes = np.array(bboxes, np.int64)
+    inside = np.array(on_center, np.bool_) & (bboxes[:,0] <= cx) & (cx < bboxes[:,0] + bboxes[:,2]) & (bboxes[:,1] <= cy) & (cy < bboxes[:,1] + bboxes[:,3])
+    best_center, best_overlap = _pick_contour(areas, bboxes, inside, (x1,y1,x2,y2), roi_fallback_overlap)
+    best = best_center if best_center >= 0 else best_overlap
+    if best < 0: return None, None, None, None, None, combined_mask
+    label, c, centroid = cands[best]
+    return label, c, centroid, float(areas[best]), tuple(int(v) for v in bboxes[best]), combined_mask
+
+def roi_changed(roi, ref_roi, threshold=None):
+    """True when roi differs from ref_roi by more than `threshold` mean absolute grey levels."""
+    if ref_roi is None or ref_roi.shape != roi.shape: return True
+    if threshold is None: threshold = roi_change_threshold
+    return cv2.norm(roi, ref_roi, cv2.NORM_L1) / roi.size > threshold
 
 def compute_contour_extent(contour):
     area = cv2.contourArea(contour)
@@ -233,39 +462,76 @@ def compute_contour_extent(contour):
     return float(area)/float(rect_area), (x,y,w,h)
 
 MM_PER_PIXEL = 0.65
+MM2_PER_PIXEL_CM2 = MM_PER_PIXEL * MM_PER_PIXEL / 100.0   # pixel area -> cm^2, as get_real_world_area
 
 def get_real_world_dims(w, h): return w * MM_PER_PIXEL, h * MM_PER_PIXEL
 def get_real_world_area(area_pixels): return (area_pixels * (MM_PER_PIXEL ** 2)) / 100.0
 
-def classify_pen_book_bottle(color_label, shape, area, bbox, frame_size, contour=None, obj_temp=None, ambient_temp=None, humidity=None):
-    fw, fh = frame_size; x, y, w, h = bbox
-    scores = {"Pen": 0.0, "Book": 0.0, "Bottle": 0.0, "Cup": 0.0, "Unknown": 1.0}
-    real_width, real_height = get_real_world_dims(w, h)
-    real_area = get_real_world_area(area)
-    
-    if shape in ("Rectangle", "Square", "Oval", "Circle") and w > 0 and h > 0:
+LABELS = ("Pen", "Book", "Bottle", "Cup", "Unknown")
+SHAPES = ("Rectangle", "Square", "Circle", "Oval", "Unknown")
+_SHAPE_IDS = {name: i for i, name in enumerate(SHAPES)}
+_SCORES = np.zeros(len(LABELS))   # scratch for _score_object; only the detection thread classifies
+
+@njit(cache=True)
+def _score_object(scores, real_width, real_height, real_area, shape_id, temp_contrast):
+    """Fills scores (Pen, Book, Bottle, Cup, Unknown) in place; returns (label index into LABELS, confidence)."""
+    scores[:] = 0.0
+    scores[4] = 1.0
+    if shape_id <= 3 and real_width > 0 and real_height > 0:
         if (max(real_width, real_height) > 3 * min(real_width, real_height)) and (max(real_width, real_height) >= 80.0):
-            scores["Pen"] = 2.8
+            scores[0] = 2.8
         if (real_area <= 10):
-            scores["Pen"] += 2.8
+            scores[0] += 2.8
 
-    if shape in ("Rectangle", "Square") and real_width > 0 and real_height > 0:
+    if shape_id <= 1 and real_width > 0 and real_height > 0:
         if (150 <= real_width <= 450 or 150 <= real_height <= 450) and (70 <= real_width <= 230 or 70 <= real_height <= 230):
-            scores["Book"] = 2.0
+            scores[1] = 2.0
 
-    if shape in ("Circle", "Oval") and real_area >= 10.0:
-        scores["Cup"] = 1
-        if obj_temp is not None and ambient_temp is not None:
-            try:
-                dt = float(obj_temp) - float(ambient_temp)
-                if abs(dt) >= 1.0: scores["Cup"] += 1.5
-            except: pass
+    if (shape_id == 2 or shape_id == 3) and real_area >= 10.0:
+        scores[3] = 1
+        if temp_contrast: scores[3] += 1.5
 
-    total = sum(scores.values())
-    if total <= 1.0: return "Unknown", 1.0, {}
-    confs = {k: scores[k] / total for k in scores}
-    best = max(confs, key=confs.get)
-    return best, float(min(1.0, confs[best])), {}
+    total = scores.sum()
+    if total <= 1.0: return 4, 1.0
+    best = np.argmax(scores)
+    return best, min(1.0, scores[best] / total)
+
+@lru_cache(maxsize=256)
+def _classify_cached(w, h, area, shape_id, temp_contrast):
+    # keyed on exactly what the scoring reads, so a hit is always the same answer
+    best, conf = _score_object(_SCORES, w * MM_PER_PIXEL, h * MM_PER_PIXEL, area * MM2_PER_PIXEL_CM2, shape_id, temp_contrast)
+    return LABELS[best], float(conf)
+
+def classify_pen_book_bottle(color_label, shape, area, bbox, frame_size, contour=None, obj_temp=None, ambient_temp=None, humidity=None):
+    x, y, w, h = bbox
+    temp_contrast = False
+    if obj_temp is not None and ambient_temp is not None:
+        try: temp_contrast = abs(float(obj_temp) - float(ambient_temp)) >= 1.0
+        except: pass
+    label, conf = _classify_cached(w, h, area, _SHAPE_IDS.get(shape, 4), temp_contrast)
+    return label, conf, {}
+
+# ---------------- Label smoothing ----------------
+class LabelWindow:
+    """Last `size` labels with a running count, so the majority check costs O(1) per frame."""
+    def __init__(self, size=SMOOTHING_FRAMES):
+        self._items = deque(); self._size = size; self._counts = Counter()
+
+    def push(self, label):
+        if len(self._items) == self._size:
+            old = self._items.popleft(); self._counts[old] -= 1
+            if not self._counts[old]: del self._counts[old]
+        self._items.append(label); self._counts[label] += 1
+
+    def clear(self): self._items.clear(); self._counts.clear()
+
+    def majority(self, required=SMOOTHING_REQUIRED):
+        """Most frequent label if it fills at least `required` slots, else None."""
+        if not self._counts: return None
+        label, n = max(self._counts.items(), key=lambda kv: kv[1])
+        return label if n >= required else None
+
+    def __len__(self): return len(self._items)
 
 
 # ---------------- MAIN EXECUTION (for standalone testing) ----------------
@@ -275,15 +541,18 @@ if __name__ == "__main__":
     if picam2 is None:
         sys.exit(1)
 
+    grabber = FrameGrabber(picam2)
+    grabber.start()
     sensor = SensorReader(port="/dev/ttyUSB0", baud=115200)
     sensor.start()
     time.sleep(0.2)
-    recent_labels = deque(maxlen=SMOOTHING_FRAMES)
+    recent_labels = LabelWindow()
     last_printed_mode = None; last_known_label = None
+    ref_roi = None; detection = None; buffers = FrameBuffers()
 
     try:
         while True:
-            frame = picam2.capture_array()[:, :, :3]
+            frame = grabber.get()
             H, W = frame.shape[:2]; cx, cy = W // 2, H // 2
             rw, rh = int(W * roi_scale), int(H * roi_scale)
             x1, y1, x2, y2 = cx - rw // 2, cy - rh // 2, cx + rw // 2, cy + rh // 2
@@ -292,29 +561,29 @@ if __name__ == "__main__":
             cv2.rectangle(guide, (x1, y1), (x2, y2), (60, 255, 60), 2)
             cv2.circle(guide, (cx, cy), 6, (60, 255, 60), 2)
 
-            _, hsv = preprocess(frame)
-            masks = get_masks(hsv)
-            label, contour, centroid, area, combined_mask = choose_best_contour((cx, cy), (x1, y1, x2, y2), masks, min_area, roi_fallback_overlap=not center_only_mode)
+            # only the ROI can produce a match, so run the pipeline on the crop alone,
+            # and only when it has changed since the last frame that was processed
+            roi = frame[y1:y2, x1:x2]
+            if detection is None or roi_changed(roi, ref_roi):
+                _, hsv = preprocess(roi, out=buffers, need_img=False)
+                masks = get_masks(hsv, out=buffers)
+                detection = choose_best_contour((cx - x1, cy - y1), (0, 0, x2 - x1, y2 - y1), masks, min_area, roi_fallback_overlap=not center_only_mode)
+                ref_roi = roi
+            label, contour, centroid, area, bbox, combined_mask = detection
             
             s = sensor.get()
             result = guide.copy()
 
             if contour is not None and centroid is not None:
                 ccx, ccy = centroid
-                cv2.drawContours(result, [contour], -1, (0, 255, 0), 2)
-                shp = shape_of(contour); bx, by, bw, bh = cv2.boundingRect(contour)
+                cv2.drawContours(result, [contour], -1, (0, 255, 0), 2, offset=(x1, y1))
+                shp = shape_of(contour, area, bbox)
                 current_label, current_conf, _ = classify_pen_book_bottle(
-                    color_label=label, shape=shp, area=area, bbox=(bx, by, bw, bh), frame_size=(W, H), contour=contour,
+                    color_label=label, shape=shp, area=area, bbox=bbox, frame_size=(W, H), contour=contour,
                     obj_temp=s.get("mlx_object"), ambient_temp=s.get("mlx_ambient"), humidity=s.get("humidity")
                 )
-                recent_labels.append((current_label, current_conf))
-                
-                chosen_label, chosen_conf = current_label, current_conf
-                if len(recent_labels) > 0:
-                    counts = {lab: [item[0] for item in recent_labels].count(lab) for lab, _ in recent_labels}
-                    best_lab = max(counts, key=counts.get)
-                    if counts[best_lab] >= SMOOTHING_REQUIRED:
-                        chosen_label = best_lab
+                recent_labels.push(current_label)
+                chosen_label = recent_labels.majority() or current_label
 
                 cv2.putText(result, f"{chosen_label} ({current_conf:.2f})", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 200, 255), 2)
                 cv2.putText(result, f"{label}, {shp}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 1)
@@ -336,6 +605,7 @@ if __name__ == "__main__":
     finally:
         print("Stopping...")
         sensor.stop()
+        grabber.stop()
         picam2.stop()
         cv2.destroyAllWindows()
         sys.exit(0)
@@ -1,25 +1,50 @@
 #!/usr/bin/env python3
 import sys
+import atexit
 import time
 import serial
 import subprocess
-import shlex
 import re
 import threading
+import queue
+import functools
+import itertools
 import json
+import gzip
 import os
+import shutil
 import tempfile
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 
+import requests
 import spotipy
+from requests.adapters import HTTPAdapter
+from spotipy.exceptions import SpotifyException
 from spotipy.oauth2 import SpotifyOAuth
+from urllib3.util.retry import Retry
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 try:
-    import camera
+    from jeepney import DBusAddress, HeaderFields, MessageFlag, MessageType, Properties, new_method_call
+    from jeepney.bus_messages import MatchRule, message_bus
+    from jeepney.io.threading import DBusRouter, open_dbus_connection
+    JEEPNEY_AVAILABLE = True
+except ImportError:
+    print("WARNING: jeepney not found. MPRIS control will shell out to qdbus.")
+    JEEPNEY_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import camera as camp
     import cv2
     DETECTION_AVAILABLE = True
 except ImportError:
@@ -41,66 +66,210 @@ STUDY_PLAYLIST_URI = 'spotify:playlist:37i9dQZF1DX8NTLI2OoQ26'
 RELAX_PLAYLIST_URI = 'spotify:playlist:37i9dQZF1DX4sWSpwq3LiO'
 
 HEADLESS = os.environ.get('HEADLESS', 'false').lower() == 'true'
+DEBUG, INFO = 10, 20
+LOG_LEVEL = DEBUG if os.environ.get('DEBUG', 'false').lower() == 'true' else INFO
+# LOG_RX=true echoes every tagged serial line into the log, LOG_RX=N one line in N;
+# off by default since gestures and tags are frequent
+_rx_env = os.environ.get('LOG_RX', 'false').lower()
+LOG_RX_EVERY = 1 if _rx_env == 'true' else int(_rx_env) if _rx_env.isdigit() else 0
+_LOG_RX = LOG_RX_EVERY > 0
+_RX_COUNTER = itertools.count()
+
+#detection pacing
+DETECTION_INTERVAL = 0.5        # seconds between frames normally
+DETECTION_MIN_INTERVAL = 0.2    # right after the label changes
+DETECTION_MAX_INTERVAL = 2.0    # ceiling once the label has been stable
+DETECTION_STABLE_FRAMES = 10
 
 app = Flask(__name__)
 CORS(app)
 
+#mpris
+MPRIS_PATH = '/org/mpris/MediaPlayer2'
+MPRIS_IFACE = 'org.mpris.MediaPlayer2'
+MPRIS_PLAYER_IFACE = 'org.mpris.MediaPlayer2.Player'
+MPRIS_VOLUME_TTL = 2.0
+
+#kdeconnect
+KDECONNECT_SERVICE = 'org.kde.kdeconnect'
+KDECONNECT_KEYBOARD_IFACE = 'org.kde.kdeconnect.device.remotekeyboard'
+
+#patterns
+_DEVICE_ID_RE = re.compile(r'([a-f0-9_]{16,})', re.I)
+_MPRIS_STRING_RE = re.compile(r'string "(.*?)"')
+_META_RE = re.compile(r'xesam:(?P<key>title|artist)\b:?(?P<value>[^\n]*)')
+# serial tags; the handler table stores each close-tag length so the body slice needs no arithmetic
+TAG_TEMP, TAG_REGISTER, TAG_DETECTED, TAG_REMOVED, TAG_GESTURE = b'TEMP', b'register', b'detected', b'removed', b'Gesture'
+TEMP_OPEN, TEMP_CLOSE = b'[TEMP]', b'[/TEMP]'
+LEN_TEMP_OPEN, LEN_TEMP_CLOSE = len(TEMP_OPEN), len(TEMP_CLOSE)
+_TAG_RE = re.compile(rb'\[(' + b'|'.join((TAG_TEMP, TAG_REGISTER, TAG_DETECTED, TAG_REMOVED, TAG_GESTURE)) + rb')\]')
+
 #global variables
 spotify_client = None
 QDBUS_CMD = None
+dbus_router = None
 ser_connection = None
+register_prompt_lock = threading.Lock()
 notifications_muted = False
 
 #states
-state = {
+class VersionedState(dict):
+    """dict whose '_version' moves on every top-level change, so cached responses know when to rebuild.
+    In-place edits of nested values must call touch(). Setting 'active_mpris_player' also
+    fills 'active_mpris_player_short', the last dotted part of the bus name shown in the UI.
+    Kept a dict rather than a slots class: {**state} is the status snapshot, and version tracking
+    on attribute writes would need a __setattr__ hook that costs more than the dict probe it saves."""
+    def __setitem__(self, key, value):
+        if key in self and self[key] == value:
+            return
+        dict.__setitem__(self, key, value)
+        if key == 'active_mpris_player':
+            self._set_short_player(value)
+        self.touch()
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        if 'active_mpris_player' in self:
+            self._set_short_player(self['active_mpris_player'])
+        self.touch()
+
+    def _set_short_player(self, player_id):
+        dict.__setitem__(self, 'active_mpris_player_short', player_id.split('.')[-1] if player_id else None)
+
+    def touch(self):
+        dict.__setitem__(self, '_version', self.get('_version', 0) + 1)
+        with state_changed:
+            state_changed.notify_all()
+
+# /api/events streams wait on this for the next version bump
+state_changed = threading.Condition()
+
+state = VersionedState({
     'active_device_id': None, 'active_device_name': None,
     'previous_device_id': None, 'previous_device_name': None,
-    'active_mpris_player': None,
+    'kde_devices': {},
+    'active_mpris_player': None, 'active_mpris_player_short': None, 'mpris_volume': {}, 'mpris_players': set(),
     'spotify_device_id': None, 'spotify_devices': [], 'spotify_now_playing': 'N/A',
     'detection_mode': 'Normal', 'detected_object': 'None',
     'last_gesture': None, 'now_playing': None,
-    'status': 'Initializing...', 'logs': [],
-    'temperature': { 'dht_temp': '--', 'humidity': '--', 'ambient_temp': '--', 'object_temp': '--' }
-}
-
-serial_buffer = {'in_temp_block': False, 'temp_lines': []}
+    'status': 'Initializing...', 'logs': deque(maxlen=150),
+    'temperature': { 'dht_temp': '--', 'humidity': '--', 'ambient_temp': '--', 'object_temp': '--' },
+    'temperature_f': { 'dht_temp': None, 'humidity': None, 'ambient_temp': None, 'object_temp': None },
+    '_version': 0
+})
+_status_cache = {'ts': 0.0, 'body': None, 'version': -1}
+STATUS_CACHE_TTL = 0.25
+EVENTS_KEEPALIVE = 15.0
+
+TEMP_NORMAL, TEMP_IN = 0, 1
+# temp_data collects one TEMP block's fields; allocated once and cleared per block
+serial_buffer = {'mode': TEMP_NORMAL, 'temp_data': {}}
+mpris_owners = {}
+mpris_names_ready = threading.Event()
+# device_id -> last MPRIS player that worked for it; trusted until an MPRIS call fails
+mpris_hint = {}
+_device_argv_prefix = {}
+spotify_queue = queue.Queue()
+serial_lines = queue.Queue()
+serial_tx = queue.Queue()   # outbound bytes; serial_writer is the only thread that writes the port
 
 
 #debug
-def add_log(message):
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    log_message = f"[{timestamp}] {message}"
-    state['logs'].insert(0, log_message)
-    if len(state['logs']) > 150: 
-        state['logs'] = state['logs'][:150]
-    print(log_message)
-
-def run_cmd(cmd, timeout=10):
+_log_queue = deque(maxlen=10000)
+LOG_FLUSH_INTERVAL = 0.05
+
+def add_log(template, *args, level=INFO):
+    """Queues template % args; a template is interned so every entry that uses it shares one string,
+    and the text is only built when echoed or served. Without args the message is taken literally
+    and not interned, since it may be one-off text. Hot paths test LOG_LEVEL themselves so a
+    disabled line costs no call at all."""
+    if level < LOG_LEVEL:
+        return
+    _log_queue.append((time.time(), sys.intern(template) if args else template, args))
+
+def _log_line(t, template, args):
+    return f"[{datetime.fromtimestamp(t):%H:%M:%S}] {template % args if args else template}"
+
+def _flush_logs():
+    """Moves queued entries into state['logs'] and echoes them with a single write."""
+    batch = []
+    while True:
+        try:
+            batch.append(_log_queue.popleft())
+        except IndexError:
+            break
+    if not batch:
+        return
+    state['logs'].extendleft(batch)
+    state.touch()
+    sys.stdout.write(''.join(_log_line(*entry) + "\n" for entry in batch))
+    sys.stdout.flush()
+
+def _log_flusher():
+    while True:
+        time.sleep(LOG_FLUSH_INTERVAL)
+        _flush_logs()
+
+threading.Thread(target=_log_flusher, daemon=True).start()
+atexit.register(_flush_logs)
+
+def format_logs():
+    """Renders the (timestamp, template, args) log entries; only done when a client asks."""
+    return [_log_line(*entry) for entry in list(state['logs'])]
+
+def ttl_cache(seconds):
+    """Caches truthy results per positional-args tuple for `seconds`; fn.cache_clear() forces a refresh."""
+    def decorator(fn):
+        cache = {}
+        lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            now = time.monotonic()
+            with lock:
+                hit = cache.get(args)
+                if hit and hit[0] > now:
+                    return hit[1]
+            value = fn(*args)
+            if value:
+                with lock:
+                    cache[args] = (now + seconds, value)
+            return value
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+def run_cmd(argv, timeout=10):
     try:
-        p = subprocess.run(
-            shlex.split(cmd) if isinstance(cmd, str) else cmd, 
-            capture_output=True, text=True, timeout=timeout
-        )
-        return p.stdout.strip(), p.returncode == 0
+        p = subprocess.run(argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=timeout)
+        return p.stdout.decode('utf-8', 'replace').strip(), p.returncode == 0
     except Exception as e:
-        add_log(f"CMD ERROR: {e}")
+        add_log("CMD ERROR: %s", e)
         return "", False
 
+def _detect_clipboard_tool():
+    """Picks the clipboard reader for this session once: wl-paste on Wayland, else xclip/xsel."""
+    wayland = os.environ.get('WAYLAND_DISPLAY') or os.environ.get('XDG_SESSION_TYPE') == 'wayland'
+    candidates = [['wl-paste'], ['xclip', '-o', '-selection', 'clipboard'], ['xsel', '--clipboard', '--output']]
+    if not wayland:
+        candidates.append(candidates.pop(0))
+    for argv in candidates:
+        if shutil.which(argv[0]):
+            return argv
+    return None
+
+_CLIPBOARD_CMD = _detect_clipboard_tool()
+
 def get_clipboard_content():
-    # Try wl-paste first (Wayland)
-    out, success = run_cmd("wl-paste", timeout=2)
-    if success and out:
-        return out
-    
-    # Try xclip (X11)
-    out, success = run_cmd("xclip -o -selection clipboard", timeout=2)
-    if success and out:
-        return out
-    
-    # Try xsel as another X11 alternative
-    out, success = run_cmd("xsel --clipboard --output", timeout=2)
-    if success and out:
-        return out
+    if _CLIPBOARD_CMD:
+        out, success = run_cmd(_CLIPBOARD_CMD, timeout=2)
+        if success and out:
+            return out
     
     add_log("Could not get clipboard. Install 'wl-clipboard' (Wayland) or 'xclip' (X11)")
     add_log("  Wayland: sudo apt-get install wl-clipboard")
@@ -108,31 +277,114 @@ def get_clipboard_content():
     return None
 
 #media players and kde connect
+def init_dbus():
+    """Opens the session bus connection shared by all MPRIS calls."""
+    global dbus_router
+    if not JEEPNEY_AVAILABLE:
+        return
+    try:
+        dbus_router = DBusRouter(open_dbus_connection(bus='SESSION'))
+        add_log("Connected to D-Bus session bus.")
+    except Exception as e:
+        dbus_router = None
+        add_log("Could not open D-Bus session bus (%s); falling back to qdbus.", e)
+        return
+    threading.Thread(target=watch_mpris_names, daemon=True).start()
+    threading.Thread(target=watch_mpris_volume, daemon=True).start()
+
+def watch_mpris_names():
+    """Maintains state['mpris_players'] from NameOwnerChanged instead of listing the bus."""
+    rule = MatchRule(type='signal', sender='org.freedesktop.DBus', interface='org.freedesktop.DBus',
+                     member='NameOwnerChanged')
+    rule.add_arg_condition(0, MPRIS_IFACE, kind='namespace')
+    if dbus_call(message_bus.AddMatch(rule)) is None:
+        return
+    with dbus_router.filter(rule, bufsize=64) as signals:
+        # Seed after subscribing so a player appearing in between is not missed
+        body = dbus_call(message_bus.ListNames())
+        if body is None:
+            return
+        state['mpris_players'].update(n for n in body[0] if n.startswith(MPRIS_IFACE + '.'))
+        state.touch()
+        mpris_names_ready.set()
+        while True:
+            name, old_owner, new_owner = signals.get().body
+            mpris_owners.pop(old_owner, None)
+            if new_owner:
+                state['mpris_players'].add(name)
+                mpris_owners[new_owner] = name
+            else:
+                state['mpris_players'].discard(name)
+                state['mpris_volume'].pop(name, None)
+                invalidate_mpris_cache()
+            state.touch()
+
+def watch_mpris_volume():
+    """Keeps state['mpris_volume'] current from PropertiesChanged signals."""
+    rule = MatchRule(type='signal', interface='org.freedesktop.DBus.Properties',
+                     member='PropertiesChanged', path=MPRIS_PATH)
+    if dbus_call(message_bus.AddMatch(rule)) is None:
+        return
+    with dbus_router.filter(rule, bufsize=64) as signals:
+        while True:
+            msg = signals.get()
+            interface, changed = msg.body[0], msg.body[1]
+            if interface != MPRIS_PLAYER_IFACE or 'Volume' not in changed:
+                continue
+            player = mpris_owners.get(msg.header.fields.get(HeaderFields.sender))
+            if player:
+                state['mpris_volume'][player] = (time.monotonic(), float(changed['Volume'][1]))
+                state.touch()
+
+def dbus_call(msg, timeout=3):
+    """Sends msg on the shared bus and returns the reply body, or None on error."""
+    try:
+        reply = dbus_router.send_and_get_reply(msg, timeout=timeout)
+    except Exception as e:
+        add_log("D-Bus ERROR: %s", e)
+        return None
+    if reply.header.message_type == MessageType.error:
+        add_log("D-Bus ERROR: %s %s", reply.header.fields.get(HeaderFields.error_name), reply.body)
+        return None
+    return reply.body
+
+def mpris_address(player, interface=MPRIS_PLAYER_IFACE):
+    return DBusAddress(MPRIS_PATH, bus_name=player, interface=interface)
+
+def mpris_available():
+    return dbus_router is not None or QDBUS_CMD is not None
+
 def detect_qdbus():
     global QDBUS_CMD
-    for cmd in ['qdbus6', 'qdbus-qt6', 'qdbus-qt5', 'qdbus']:
-        if run_cmd([cmd, '--version'], 2)[1]:
+    candidates = ['qdbus6', 'qdbus-qt6', 'qdbus-qt5', 'qdbus']
+    # Probe all candidates at once but keep the preference order when picking
+    with ThreadPoolExecutor(max_workers=len(candidates)) as ex:
+        found = list(ex.map(lambda cmd: run_cmd([cmd, '--version'], 2)[1], candidates))
+    for cmd, ok in zip(candidates, found):
+        if ok:
             QDBUS_CMD = cmd
-            add_log(f"D-Bus tool detected: {cmd}")
+            add_log("D-Bus tool detected: %s", cmd)
             return
     add_log("WARNING: No qdbus found. Media control will be limited.")
 
 def diagnose_kde_connect():
     add_log("=== KDE Connect Diagnostics ===")
+    list_available_devices.cache_clear()
+    invalidate_mpris_cache()
     
-    version_out, version_ok = run_cmd("kdeconnect-cli --version", timeout=3)
+    version_out, version_ok = run_cmd(['kdeconnect-cli', '--version'], timeout=3)
     if version_ok:
-        add_log(f"KDE Connect version: {version_out.splitlines()[0] if version_out else 'Unknown'}")
+        add_log("KDE Connect version: %s", version_out.splitlines()[0] if version_out else 'Unknown')
     else:
         add_log("ERROR: kdeconnect-cli not found or not working")
         return False
     
     # List all devices
-    list_out, list_ok = run_cmd("kdeconnect-cli --list-devices", timeout=5)
-    add_log(f"All devices:\n{list_out}")
+    list_out, list_ok = run_cmd(['kdeconnect-cli', '--list-devices'], timeout=5)
+    add_log("All devices:\n%s", list_out)
 
-    avail_out, avail_ok = run_cmd("kdeconnect-cli --list-available", timeout=5)
-    add_log(f"Available devices:\n{avail_out}")
+    avail_out, avail_ok = run_cmd(['kdeconnect-cli', '--list-available'], timeout=5)
+    add_log("Available devices:\n%s", avail_out)
     
     # Check if any device is available
     devices = list_available_devices()
@@ -142,28 +394,36 @@ def diagnose_kde_connect():
         return False
     
     for dev in devices:
-        add_log(f"\nTesting device: {dev['name']} ({dev['id']})")
+        add_log("\nTesting device: %s (%s)", dev['name'], dev['id'])
         
         # Test ping
-        ping_out, ping_ok = run_cmd(f"kdeconnect-cli -d {dev['id']} --ping", timeout=5)
-        add_log(f"  Ping test: {'OK' if ping_ok else 'FAILED'} - {ping_out}")
+        ping_out, ping_ok = run_cmd(device_argv(dev['id'], '--ping'), timeout=5)
+        add_log("  Ping test: %s - %s", 'OK' if ping_ok else 'FAILED', ping_out)
         
         # Check available commands
-        help_out, _ = run_cmd(f"kdeconnect-cli -d {dev['id']} --help", timeout=3)
+        help_out, _ = run_cmd(device_argv(dev['id'], '--help'), timeout=3)
         if '--send-key' in help_out:
-            add_log(f"  --send-key: Supported")
+            add_log("  --send-key: Supported")
         else:
-            add_log(f"  --send-key: NOT FOUND in help (may not be supported)")
+            add_log("  --send-key: NOT FOUND in help (may not be supported)")
         
         # Try a test key send
-        test_out, test_ok = run_cmd(f"kdeconnect-cli -d {dev['id']} --send-key play", timeout=5)
-        add_log(f"  Test key send: {'OK' if test_ok else 'FAILED'} - {test_out}")
+        test_out, test_ok = run_cmd(device_argv(dev['id'], '--send-key', 'play'), timeout=5)
+        add_log("  Test key send: %s - %s", 'OK' if test_ok else 'FAILED', test_out)
     
     add_log("=== End Diagnostics ===")
     return True
 
+def device_argv(device_id, *args):
+    """kdeconnect-cli argv for device_id; the per-device prefix is built once."""
+    prefix = _device_argv_prefix.get(device_id)
+    if prefix is None:
+        prefix = _device_argv_prefix[device_id] = ['kdeconnect-cli', '-d', device_id]
+    return prefix + list(args)
+
+@ttl_cache(seconds=5)
 def list_available_devices():
-    out, s = run_cmd("kdeconnect-cli --list-available")
+    out, s = run_cmd(['kdeconnect-cli', '--list-available'])
     devices = []
     if s:
         for line in out.splitlines():
@@ -173,32 +433,42 @@ def list_available_devices():
                     name = parts[0].strip().strip('-').strip()
                     rest = parts[1]
                     # Extract device ID
-                    match = re.search(r'([a-f0-9_]{16,})', rest, re.I)
+                    match = _DEVICE_ID_RE.search(rest)
                     if match:
                         devices.append({'name': name, 'id': match.group(1)})
 
     if not devices:
         add_log("Trying alternative device list parsing...")
-        out2, s2 = run_cmd("kdeconnect-cli --list-devices")
+        out2, s2 = run_cmd(['kdeconnect-cli', '--list-devices'])
         if s2:
             for line in out2.splitlines():
                 if ':' in line:
-                    match = re.search(r'([a-f0-9_]{16,})', line, re.I)
+                    match = _DEVICE_ID_RE.search(line)
                     if match:
                         name = line.split(':')[0].strip().strip('-').strip()
                         devices.append({'name': name, 'id': match.group(1)})
     
+    for dev in devices:
+        if dev['id'] not in _device_argv_prefix:
+            _device_argv_prefix[dev['id']] = ['kdeconnect-cli', '-d', dev['id']]
+    state['kde_devices'] = {dev['id']: dev['name'] for dev in devices}
     return devices
 
+def kde_device_name(device_id):
+    """Name from the last device listing; only lists again for an id it has not seen."""
+    if device_id not in state['kde_devices']:
+        list_available_devices()
+    return state['kde_devices'].get(device_id)
+
 def control_remote_media(device_id, action, volume_delta=None):
-    if not QDBUS_CMD:
-        add_log("ERROR: qdbus not available for MPRIS control")
+    if not mpris_available():
+        add_log("ERROR: neither D-Bus nor qdbus available for MPRIS control")
         return False
     
     # Find the MPRIS player for this device
     player = find_mpris_player_for_device(device_id)
     if not player:
-        add_log(f"ERROR: No MPRIS player found for device {device_id}")
+        add_log("ERROR: No MPRIS player found for device %s", device_id)
         add_log("Make sure media is playing on your device")
         return False
     
@@ -216,75 +486,191 @@ def control_remote_media(device_id, action, volume_delta=None):
             return send_mpris_command(player, 'Stop')
         
         elif action in ['volume_up', 'volume_down', 'mute']:
-            # Get current volume
-            out, success = run_cmd([
-                QDBUS_CMD, player, '/org/mpris/MediaPlayer2',
-                'org.freedesktop.DBus.Properties.Get',
-                'org.mpris.MediaPlayer2.Player', 'Volume'
-            ], timeout=3)
-            
-            if not success:
-                add_log("WARNING: Could not get current volume from MPRIS player")
-                return False
-            
-            try:
-                current_volume = float(out.strip())
-            except ValueError:
-                add_log(f"WARNING: Invalid volume value: {out}")
+            # Use the cached volume when fresh, so a gesture costs a single Set
+            cached = state['mpris_volume'].get(player)
+            if cached and time.monotonic() - cached[0] < MPRIS_VOLUME_TTL:
+                current_volume = cached[1]
+            else:
+                current_volume = get_mpris_volume(player)
+            if current_volume is None:
+                invalidate_mpris_cache()
                 return False
             
             new_volume = current_volume
             
             if action == 'mute':
                 new_volume = 0.0 if current_volume > 0.05 else 0.5
-                add_log(f"Mute toggle: {current_volume:.2f} -> {new_volume:.2f}")
+                if LOG_LEVEL <= DEBUG: add_log("Mute toggle: %.2f -> %.2f", current_volume, new_volume, level=DEBUG)
             
             elif action == 'volume_up':
                 delta = volume_delta if volume_delta else 0.1
                 new_volume = min(1.0, current_volume + abs(delta))
-                add_log(f"Volume up: {current_volume:.2f} -> {new_volume:.2f}")
+                if LOG_LEVEL <= DEBUG: add_log("Volume up: %.2f -> %.2f", current_volume, new_volume, level=DEBUG)
             
             elif action == 'volume_down':
                 delta = volume_delta if volume_delta else 0.1
                 new_volume = max(0.0, current_volume - abs(delta))
-                add_log(f"Volume down: {current_volume:.2f} -> {new_volume:.2f}")
+                if LOG_LEVEL <= DEBUG: add_log("Volume down: %.2f -> %.2f", current_volume, new_volume, level=DEBUG)
             
-            success = run_cmd([
-                QDBUS_CMD, player, '/org/mpris/MediaPlayer2',
-                'org.freedesktop.DBus.Properties.Set',
-                'org.mpris.MediaPlayer2.Player', 'Volume', str(new_volume)
-            ], timeout=3)[1]
+            success = set_mpris_volume(player, new_volume)
             
             if success:
+                state['mpris_volume'][player] = (time.monotonic(), new_volume)
+                state.touch()
                 percentage = int(new_volume * 100)
-                add_log(f"Volume set to {percentage}%")
+                add_log("Volume set to %d%%", percentage)
             else:
                 add_log("ERROR: Failed to set volume")
+                state['mpris_volume'].pop(player, None)
+                state.touch()
+                invalidate_mpris_cache()
             
             return success
         
         else:
-            add_log(f"ERROR: Unknown action '{action}'")
+            add_log("ERROR: Unknown action '%s'", action)
             return False
     
     except Exception as e:
-        add_log(f"ERROR in control_remote_media: {e}")
+        add_log("ERROR in control_remote_media: %s", e)
         return False
 
+def get_mpris_volume(player):
+    if dbus_router:
+        body = dbus_call(Properties(mpris_address(player)).get('Volume'))
+        if body is None:
+            add_log("WARNING: Could not get current volume from MPRIS player")
+            return None
+        if player not in mpris_owners.values():
+            owner = dbus_call(message_bus.GetNameOwner(player))
+            if owner:
+                mpris_owners[owner[0]] = player
+        volume = float(body[0][1])
+        state['mpris_volume'][player] = (time.monotonic(), volume)
+        state.touch()
+        return volume
+
+    out, success = run_cmd([
+        QDBUS_CMD, player, MPRIS_PATH,
+        'org.freedesktop.DBus.Properties.Get',
+        MPRIS_PLAYER_IFACE, 'Volume'
+    ], timeout=3)
+    
+    if not success:
+        add_log("WARNING: Could not get current volume from MPRIS player")
+        return None
+    
+    try:
+        return float(out.strip())
+    except ValueError:
+        add_log("WARNING: Invalid volume value: %s", out)
+        return None
+
+def set_mpris_volume(player, volume):
+    if dbus_router:
+        return dbus_call(Properties(mpris_address(player)).set('Volume', 'd', float(volume))) is not None
+    return run_cmd([
+        QDBUS_CMD, player, MPRIS_PATH,
+        'org.freedesktop.DBus.Properties.Set',
+        MPRIS_PLAYER_IFACE, 'Volume', str(volume)
+    ], timeout=3)[1]
+
+# Without a session bus, kdeconnect-cli is the only way in and it has no batch mode, so one
+# helper process reads "device_id key" lines and runs the CLI once per key; callers only pay
+# for a pipe write and learn nothing about delivery.
+_KDE_HELPER = r"""
+import subprocess, sys
+for line in sys.stdin:
+    parts = line.split()
+    if len(parts) == 2:
+        subprocess.run(['kdeconnect-cli', '-d', parts[0], '--send-key', parts[1]],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+"""
+
+class PersistentKdeConnect:
+    """Long-lived key sender for the no-D-Bus fallback; restarted on demand if the helper dies."""
+    def __init__(self):
+        self.proc = None
+        self.lock = threading.Lock()
+
+    def _ensure(self):
+        if self.proc is None or self.proc.poll() is not None:
+            self.proc = subprocess.Popen(
+                [sys.executable, '-c', _KDE_HELPER],
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True
+            )
+        return self.proc
+
+    def send(self, device_id, key, count=1):
+        """Queues the keys; True means the helper took them, not that they were delivered."""
+        line = f"{device_id} {key}\n"
+        with self.lock:
+            try:
+                proc = self._ensure()
+                proc.stdin.write(line * count)
+                proc.stdin.flush()
+                return True
+            except (OSError, ValueError) as e:
+                add_log("KDE helper ERROR: %s", e)
+                self.proc = None
+                return False
+
+kde_keys = PersistentKdeConnect()
+
+def kde_keyboard_address(device_id):
+    return DBusAddress(f'/modules/kdeconnect/devices/{device_id}/remotekeyboard',
+                       bus_name=KDECONNECT_SERVICE, interface=KDECONNECT_KEYBOARD_IFACE)
+
+def send_kde_keys(device_id, key, count=1):
+    if not dbus_router:
+        return kde_keys.send(device_id, key, count)
+    # Same sendKeyPress(key, specialKey=-1, shift, ctrl, alt) call kdeconnect-cli makes, straight
+    # to the daemon; the bus keeps per-connection order, so only the last call needs a reply
+    args = (key, -1, False, False, False)
+    try:
+        for _ in range(count - 1):
+            msg = new_method_call(kde_keyboard_address(device_id), 'sendKeyPress', 'sibbb', args)
+            msg.header.flags |= MessageFlag.no_reply_expected
+            dbus_router.send(msg)
+    except Exception as e:
+        add_log("D-Bus ERROR: %s", e)
+    return dbus_call(new_method_call(kde_keyboard_address(device_id), 'sendKeyPress', 'sibbb', args)) is not None
+
+def send_media_key(device_id, key):
+    return send_kde_keys(device_id, key)
+
 def send_repeated_media_keys(device_id, key, count):
     """Send a media key multiple times"""
-    add_log(f"Sending {count}x {key} to device")
-    for _ in range(count):
-        send_media_key(device_id, key)
-        time.sleep(0.1) 
-
+    method = {'next': 'Next', 'previous': 'Previous'}.get(key)
+    player = find_mpris_player_for_device(device_id) if method and mpris_available() else None
+    if player:
+        return send_mpris_command(player, method, count)
+    if LOG_LEVEL <= DEBUG: add_log("Sending %dx %s to device", count, key, level=DEBUG)
+    return send_kde_keys(device_id, key, count)
+
+@ttl_cache(seconds=2)
 def get_all_mpris_players():
     players = []
+    if dbus_router:
+        if mpris_names_ready.is_set():
+            services = list(state['mpris_players'])
+        else:
+            body = dbus_call(message_bus.ListNames())
+            if body is None:
+                add_log("D-Bus failed to list services.")
+                return players
+            services = body[0]
+        for service in services:
+            if service.startswith(MPRIS_IFACE + '.'):
+                works = dbus_call(Properties(mpris_address(service, MPRIS_IFACE)).get('Identity'), timeout=1) is not None
+                players.append({'id': service, 'name': service.split('.')[-1], 'responsive': works})
+        return players
+
     if not QDBUS_CMD:
         add_log("qdbus not available; cannot list MPRIS players.")
         return players
 
-    out, success = run_cmd(QDBUS_CMD)
+    out, success = run_cmd([QDBUS_CMD])
     if not success:
         add_log("qdbus failed to list services.")
         return players
@@ -293,19 +679,29 @@ def get_all_mpris_players():
         if 'org.mpris.MediaPlayer2' in line:
             service = line.strip()
             _, works = run_cmd([
-                QDBUS_CMD, service, '/org/mpris/MediaPlayer2', 
+                QDBUS_CMD, service, MPRIS_PATH, 
                 'org.freedesktop.DBus.Properties.Get', 
-                'org.mpris.MediaPlayer2', 'Identity'
+                MPRIS_IFACE, 'Identity'
             ], timeout=1)
             name = service.split('.')[-1] if '.' in service else service
             players.append({'id': service, 'name': name, 'responsive': works})
     return players
 
+@ttl_cache(seconds=2)
 def find_mpris_player_for_device(device_id=None):
-    if not QDBUS_CMD: 
+    if not mpris_available(): 
         return None
     
-    players = get_all_mpris_players()
+    # On D-Bus the hint must still own its bus name; qdbus has no live name set to check
+    hint = mpris_hint.get(device_id)
+    if hint and (not mpris_names_ready.is_set() or hint in state['mpris_players']):
+        return hint
+    
+    if mpris_names_ready.is_set():
+        # Names on the live set have an owner on the bus, no need to probe them
+        players = [{'id': p, 'responsive': True} for p in sorted(state['mpris_players'])]
+    else:
+        players = get_all_mpris_players()
     if not players:
         add_log("No MPRIS players found.")
         return None
@@ -314,51 +710,92 @@ def find_mpris_player_for_device(device_id=None):
         device_id_short = device_id[-8:].lower()
         for p in players:
             if device_id_short in p['id'].lower() and p['responsive']:
-                add_log(f"Found matching MPRIS player: {p['id']}")
+                add_log("Found matching MPRIS player: %s", p['id'])
+                mpris_hint[device_id] = p['id']
                 return p['id']
 
     for p in players:
         if p['responsive']:
-            add_log(f"Found active MPRIS player: {p['id']}")
+            add_log("Found active MPRIS player: %s", p['id'])
+            mpris_hint[device_id] = p['id']
             return p['id']
     
     add_log("Found MPRIS players, but none responsive. Returning first.")
     return players[0]['id']
 
-def send_mpris_command(player, method):
-    add_log(f"Sending MPRIS command '{method}' to player.")
-    success = run_cmd([
-        QDBUS_CMD, player, '/org/mpris/MediaPlayer2', 
-        f'org.mpris.MediaPlayer2.Player.{method}'
-    ])[1]
+def invalidate_mpris_cache():
+    mpris_hint.clear()
+    get_all_mpris_players.cache_clear()
+    find_mpris_player_for_device.cache_clear()
+
+def send_mpris_command(player, method, count=1):
+    if LOG_LEVEL <= DEBUG:
+        if count > 1: add_log("Sending MPRIS command '%s' to player x%d.", method, count, level=DEBUG)
+        else: add_log("Sending MPRIS command '%s' to player.", method, level=DEBUG)
+    if dbus_router:
+        # The bus keeps per-connection order, so only the last call needs a reply
+        try:
+            for _ in range(count - 1):
+                msg = new_method_call(mpris_address(player), method)
+                msg.header.flags |= MessageFlag.no_reply_expected
+                dbus_router.send(msg)
+        except Exception as e:
+            add_log("D-Bus ERROR: %s", e)
+        success = dbus_call(new_method_call(mpris_address(player), method)) is not None
+    else:
+        success = all(run_cmd([
+            QDBUS_CMD, player, MPRIS_PATH, 
+            f'{MPRIS_PLAYER_IFACE}.{method}'
+        ])[1] for _ in range(count))
     if not success: 
-        add_log(f"MPRIS command '{method}' failed.")
+        add_log("MPRIS command '%s' failed.", method)
+        invalidate_mpris_cache()
     return success
 
+def get_mpris_metadata(player):
+    """Returns the player's Metadata a{sv} as a plain {key: value} dict, or None."""
+    body = dbus_call(Properties(mpris_address(player)).get('Metadata'))
+    if body is None:
+        return None
+    return {key: value for key, (_, value) in body[0][1].items()}
+
 def get_now_playing(player):
+    if dbus_router:
+        meta = get_mpris_metadata(player)
+        if meta is None:
+            return "N/A"
+        title = meta.get('xesam:title') or 'Unknown Title'
+        artists = meta.get('xesam:artist') or 'Unknown Artist'
+        if not isinstance(artists, str):
+            artists = " & ".join(artists)
+        return f"{artists} - {title}"
+
     out, s = run_cmd([
-        QDBUS_CMD, player, '/org/mpris/MediaPlayer2', 
+        QDBUS_CMD, player, MPRIS_PATH, 
         'org.freedesktop.DBus.Properties.Get', 
-        'org.mpris.MediaPlayer2.Player', 'Metadata'
+        MPRIS_PLAYER_IFACE, 'Metadata'
     ])
     if s:
         info = {'artist': 'Unknown Artist', 'title': 'Unknown Title'}
-        for line in out.splitlines():
-            if 'xesam:title' in line: 
-                info['title'] = line.split(':', 1)[-1].strip().strip('"')
-            elif 'xesam:artist' in line:
-                artists = re.findall(r'string \"(.*?)\"', line)
-                if artists: 
+        for m in _META_RE.finditer(out):
+            value = m.group('value')
+            if m.group('key') == 'title':
+                info['title'] = value.strip().strip('"') or info['title']
+            else:
+                artists = _MPRIS_STRING_RE.findall(value) or [value.strip()]
+                if artists[0]:
                     info['artist'] = " & ".join(artists)
         return f"{info['artist']} - {info['title']}"
     return "N/A"
 
 def ping_device(device_id, message): 
-    run_cmd(f'kdeconnect-cli -d {device_id} --ping-msg "{message}"')
+    run_cmd(device_argv(device_id, '--ping-msg', message))
+
+# tmpfs keeps the clipboard fallback file and uploads in RAM
+SHARE_TMP_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
 
 def share_clipboard_to_device(device_id, content):
-    cmd = f'kdeconnect-cli -d {device_id} --share-text "{content}"'
-    out, success = run_cmd(cmd)
+    out, success = run_cmd(device_argv(device_id, '--share-text', content))
     
     if success:
         add_log("Clipboard sent via --share-text")
@@ -366,12 +803,11 @@ def share_clipboard_to_device(device_id, content):
     
     add_log("Direct text share failed, trying file method...")
     try:
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as f:
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', dir=SHARE_TMP_DIR) as f:
             f.write(content)
             temp_path = f.name
         
-        cmd = f'kdeconnect-cli -d {device_id} --share "{temp_path}"'
-        out, success = run_cmd(cmd)
+        out, success = run_cmd(device_argv(device_id, '--share', temp_path))
         
         try:
             os.unlink(temp_path)
@@ -385,22 +821,21 @@ def share_clipboard_to_device(device_id, content):
             add_log("Failed to share clipboard via both methods")
             return False
     except Exception as e:
-        add_log(f"Error sharing clipboard: {e}")
+        add_log("Error sharing clipboard: %s", e)
         return False
 
 def share_file_to_device(device_id, file_path):
     if not os.path.exists(file_path):
-        add_log(f"File not found: {file_path}")
+        add_log("File not found: %s", file_path)
         return False
     
-    cmd = f'kdeconnect-cli -d {device_id} --share "{file_path}"'
-    out, success = run_cmd(cmd)
+    out, success = run_cmd(device_argv(device_id, '--share', file_path))
     
     if success:
-        add_log(f"File sent: {os.path.basename(file_path)}")
+        add_log("File sent: %s", os.path.basename(file_path))
         return True
     else:
-        add_log(f"Failed to send file: {os.path.basename(file_path)}")
+        add_log("Failed to send file: %s", os.path.basename(file_path))
         return False
 
 #spotify control
@@ -427,29 +862,64 @@ def init_spotify(force=False):
         if HEADLESS:
             add_log("Running in HEADLESS mode - no browser will open")
             auth_url = auth.get_authorize_url()
-            add_log(f"SPOTIFY AUTH URL: {auth_url}")
+            add_log("SPOTIFY AUTH URL: %s", auth_url)
             print(f"\n{'='*70}")
             print(f"SPOTIFY AUTHORIZATION REQUIRED")
             print(f"Please visit this URL in a browser:")
             print(f"{auth_url}")
             print(f"{'='*70}\n")
         
-        spotify_client = spotipy.Spotify(auth_manager=auth)
-        spotify_client.me()
-        add_log("Spotify authenticated successfully.")
+        # One keep-alive session so playback calls reuse the TLS connection;
+        # spotipy skips its own retry setup when handed a session, so mount it here
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(
+            pool_connections=4, pool_maxsize=8,
+            max_retries=Retry(total=2, backoff_factor=0.2,
+                              status_forcelist=(429, 500, 502, 503, 504), allowed_methods=None)
+        ))
+        # The token is checked by the first playback call rather than a me() probe
+        spotify_client = spotipy.Spotify(auth_manager=auth, requests_session=session)
+        add_log("Spotify client ready.")
     except Exception as e:
         spotify_client = None
-        add_log(f"Spotify Init Error: {e}")
+        add_log("Spotify Init Error: %s", e)
 
 def toggle_notifications_muted(mute: bool):
     global notifications_muted
-    _, success = run_cmd(f"dunstctl set-paused {'true' if mute else 'false'}")
+    _, success = run_cmd(['dunstctl', 'set-paused', 'true' if mute else 'false'])
     if success: 
         notifications_muted = mute
-        add_log(f"Notifications {'Muted' if mute else 'Unmuted'}")
+        add_log("Notifications %s", 'Muted' if mute else 'Unmuted')
     else:
         add_log("dunstctl not available for notification control")
 
+def spotify_worker():
+    """Runs queued playback calls off the caller's thread; a burst of mode
+    switches collapses to the most recent request."""
+    while True:
+        job = spotify_queue.get()
+        while True:
+            try:
+                job = spotify_queue.get_nowait()
+            except queue.Empty:
+                break
+        method, kwargs, done_msg = job
+        try:
+            try:
+                getattr(spotify_client, method)(**kwargs)
+            except SpotifyException as e:
+                if e.http_status != 401:
+                    raise
+                add_log("Spotify token rejected, re-authenticating...")
+                init_spotify(force=True)
+                if not spotify_client:
+                    continue
+                getattr(spotify_client, method)(**kwargs)
+            if done_msg:
+                add_log(done_msg)
+        except Exception as e:
+            add_log("Spotify Error: %s", e)
+
 def activate_study_mode():
     if state['detection_mode'] == 'Study': 
         return
@@ -457,14 +927,10 @@ def activate_study_mode():
     state['detection_mode'] = 'Study'
     
     if spotify_client and state['spotify_device_id']:
-        try:
-            spotify_client.start_playback(
-                device_id=state['spotify_device_id'], 
-                context_uri=STUDY_PLAYLIST_URI
-            )
-            add_log("Started Spotify Study Playlist.")
-        except Exception as e: 
-            add_log(f"Spotify Error: {e}")
+        spotify_queue.put(('start_playback', {
+            'device_id': state['spotify_device_id'], 
+            'context_uri': STUDY_PLAYLIST_URI
+        }, "Started Spotify Study Playlist."))
     
     toggle_notifications_muted(True)
 
@@ -475,14 +941,10 @@ def activate_relax_mode():
     state['detection_mode'] = 'Relax'
     
     if spotify_client and state['spotify_device_id']:
-        try:
-            spotify_client.start_playback(
-                device_id=state['spotify_device_id'], 
-                context_uri=RELAX_PLAYLIST_URI
-            )
-            add_log("Started Spotify Relax Playlist.")
-        except Exception as e: 
-            add_log(f"Spotify Error: {e}")
+        spotify_queue.put(('start_playback', {
+            'device_id': state['spotify_device_id'], 
+            'context_uri': RELAX_PLAYLIST_URI
+        }, "Started Spotify Relax Playlist."))
     
     toggle_notifications_muted(False)
 
@@ -492,114 +954,110 @@ def deactivate_modes():
         state['detection_mode'] = 'Normal'
         
         if spotify_client and state['spotify_device_id']:
-            try: 
-                spotify_client.pause_playback(device_id=state['spotify_device_id'])
-            except Exception as e: 
-                add_log(f"Spotify Error: {e}")
+            spotify_queue.put(('pause_playback', {
+                'device_id': state['spotify_device_id']
+            }, None))
         
         toggle_notifications_muted(False)
 
 # =========================
 # GESTURE ACTIONS
 # =========================
-def perform_gesture_action(gesture_id, gesture_meta=None):
-    state['last_gesture'] = gesture_id
-    gesture_meta = gesture_meta or {}
-    
-    add_log(f"Gesture {gesture_id} received: {gesture_meta}")
+def _handle_hold(aid, gesture_meta):
+    add_log("HOLD Gesture: Toggling active KDE device...")
+    if state['previous_device_id'] and state['active_device_id']:
+        state['active_device_id'], state['previous_device_id'] = \
+            state['previous_device_id'], state['active_device_id']
+        state['active_device_name'], state['previous_device_name'] = \
+            state['previous_device_name'], state['active_device_name']
 
-    if gesture_id == 3:
-        add_log("HOLD Gesture: Toggling active KDE device...")
-        if state['previous_device_id'] and state['active_device_id']:
-            state['active_device_id'], state['previous_device_id'] = \
-                state['previous_device_id'], state['active_device_id']
-            state['active_device_name'], state['previous_device_name'] = \
-                state['previous_device_name'], state['active_device_name']
+        add_log("Switching to: %s", state['active_device_name'])
+        state['active_mpris_player'] = find_mpris_player_for_device(state['active_device_id'])
 
-            add_log(f"Switching to: {state['active_device_name']}")
-            state['active_mpris_player'] = find_mpris_player_for_device(state['active_device_id'])
+        if not state['active_mpris_player']:
+            state['active_mpris_player'] = find_mpris_player_for_device()
 
-            if not state['active_mpris_player']:
-                state['active_mpris_player'] = find_mpris_player_for_device()
-
-            if state['active_mpris_player']:
-                state['now_playing'] = get_now_playing(state['active_mpris_player'])
-
-            add_log(f"Active device is now: {state['active_device_name']}")
-            ping_device(state['active_device_id'], "Control Active")
-        else:
-            add_log("Toggle failed: Only one device has been active.")
-        return
-    if not state['active_device_id']:
-        add_log("Gesture ignored: No active device detected.")
-        return
+        if state['active_mpris_player']:
+            state['now_playing'] = get_now_playing(state['active_mpris_player'])
 
-    if gesture_id == 1:
-        add_log("TAP: Play/Pause")
-        control_remote_media(state['active_device_id'], 'play')
+        add_log("Active device is now: %s", state['active_device_name'])
+        ping_device(state['active_device_id'], "Control Active")
+    else:
+        add_log("Toggle failed: Only one device has been active.")
+
+def _handle_tap(aid, gesture_meta):
+    add_log("TAP: Play/Pause")
+    control_remote_media(aid, 'play')
+
+def _handle_flick(aid, gesture_meta):
+    add_log("FLICK: Next Track")
+    control_remote_media(aid, 'next')
+
+def _parse_volume_delta(gesture_meta, default_sign):
+    """Maps a gesture's volume_change to (action, delta, log message, log level).
+    The sign of the value wins over the gesture's own direction (default_sign, +1 or -1).
+    Defaults and bad values are logged at INFO so they stay visible; a normal step is DEBUG."""
+    name = 'UP' if default_sign > 0 else 'DOWN'
+    default = 'volume_up' if default_sign > 0 else 'volume_down'
+    volume_change = gesture_meta.get('volume_change')
+    if volume_change is None:
+        return default, 0.1, f"{name}: Volume {name.capitalize()} (default {'+' if default_sign > 0 else '-'}10%)", INFO
+    try:
+        vol_value = float(volume_change)
+    except (ValueError, TypeError):
+        return default, 0.1, f"Invalid volume_change value: {volume_change}, using default", INFO
+    if vol_value == 0:
+        return 'mute', None, "Volume change is 0: muting", INFO
+
+    delta = abs(vol_value) / 100.0
+    action = 'volume_up' if vol_value > 0 else 'volume_down'
+    if LOG_LEVEL > DEBUG:
+        return action, delta, None, DEBUG
+    note = "" if action == default else f" ({'positive' if vol_value > 0 else 'negative'} value in {name} gesture)"
+    return action, delta, f"Volume {'Up' if vol_value > 0 else 'Down'} by {delta:.2f}{note}", DEBUG
+
+def _apply_volume(aid, gesture_meta, default_sign):
+    action, delta, message, level = _parse_volume_delta(gesture_meta, default_sign)
+    if message: add_log(message, level=level)
+    if delta is None:
+        control_remote_media(aid, action)
+    else:
+        control_remote_media(aid, action, delta)
 
-    elif gesture_id == 2:
-        add_log("FLICK: Next Track")
-        control_remote_media(state['active_device_id'], 'next')
+def _handle_clipboard(aid, gesture_meta):
+    content = get_clipboard_content()
+    if content:
+        add_log("Sharing clipboard to %s...", state['active_device_name'])
+        share_clipboard_to_device(aid, content)
+    else:
+        add_log("Clipboard is empty or xclip failed.")
+
+GESTURE_HANDLERS = {
+    1: _handle_tap,
+    2: _handle_flick,
+    3: _handle_hold,
+    4: lambda aid, m: _apply_volume(aid, m, +1),
+    5: lambda aid, m: _apply_volume(aid, m, -1),
+    6: _handle_clipboard,
+}
 
-    elif gesture_id == 4:
-        volume_change = gesture_meta.get('volume_change')
-        
-        if volume_change is not None:
-            try:
-                vol_value = float(volume_change)
-                if vol_value == 0:
-                    add_log("Volume change is 0: muting")
-                    control_remote_media(state['active_device_id'], 'mute')
-                else:
-                    delta = abs(vol_value) / 100.0
-                    if vol_value > 0:
-                        add_log(f"Volume Up by {delta:.2f}")
-                        control_remote_media(state['active_device_id'], 'volume_up', delta)
-                    else:
-                        add_log(f"Volume Down by {delta:.2f} (negative value in UP gesture)")
-                        control_remote_media(state['active_device_id'], 'volume_down', delta)
-            except (ValueError, TypeError):
-                add_log(f"Invalid volume_change value: {volume_change}, using default")
-                control_remote_media(state['active_device_id'], 'volume_up', 0.1)
-        else:
-            add_log("UP: Volume Up (default +10%)")
-            control_remote_media(state['active_device_id'], 'volume_up', 0.1)
+def perform_gesture_action(gesture_id, gesture_meta=None):
+    state['last_gesture'] = gesture_id
+    gesture_meta = gesture_meta or {}
+    
+    if LOG_LEVEL <= DEBUG: add_log("Gesture %s received: %s", gesture_id, gesture_meta, level=DEBUG)
 
-    elif gesture_id == 5:
-        volume_change = gesture_meta.get('volume_change')
-        
-        if volume_change is not None:
-            try:
-                vol_value = float(volume_change)
-                if vol_value == 0:
-                    add_log("Volume change is 0: muting")
-                    control_remote_media(state['active_device_id'], 'mute')
-                else:
-                    delta = abs(vol_value) / 100.0
-                    if vol_value < 0:
-                        add_log(f"Volume Down by {delta:.2f}")
-                        control_remote_media(state['active_device_id'], 'volume_down', delta)
-                    else:
-                        add_log(f"Volume Up by {delta:.2f} (positive value in DOWN gesture)")
-                        control_remote_media(state['active_device_id'], 'volume_up', delta)
-            except (ValueError, TypeError):
-                add_log(f"Invalid volume_change value: {volume_change}, using default")
-                control_remote_media(state['active_device_id'], 'volume_down', 0.1)
-        else:
-            add_log("DOWN: Volume Down (default -10%)")
-            control_remote_media(state['active_device_id'], 'volume_down', 0.1)
-
-    elif gesture_id == 6:
-        content = get_clipboard_content()
-        if content:
-            add_log(f"Sharing clipboard to {state['active_device_name']}...")
-            share_clipboard_to_device(state['active_device_id'], content)
-        else:
-            add_log("Clipboard is empty or xclip failed.")
+    # HOLD switches between known devices, so it is the only gesture allowed without one
+    aid = state['active_device_id']
+    if gesture_id != 3 and not aid:
+        add_log("Gesture ignored: No active device detected.")
+        return
 
-    else:
-        add_log(f"Unknown gesture ID: {gesture_id}")
+    handler = GESTURE_HANDLERS.get(gesture_id)
+    if handler is None:
+        add_log("Unknown gesture ID: %s", gesture_id)
+        return
+    handler(aid, gesture_meta)
 
 # object detection
 def detection_handler():
@@ -613,53 +1071,72 @@ def detection_handler():
         add_log("Halting detection: camera failed.")
         return
     
-    recent_labels = deque(maxlen=camp.SMOOTHING_FRAMES)
+    grabber = camp.FrameGrabber(picam2)
+    grabber.start()
+    recent_labels = camp.LabelWindow(camp.SMOOTHING_FRAMES)
     last_printed_mode = None
     last_known_label = None
-
+    ref_roi = None
+    detection = None
+    was_sparse = False
+    buffers = camp.FrameBuffers()
+    ema_rtt = 0.0
+    interval = DETECTION_INTERVAL
+    seen_label = None
+    stable_frames = 0
+    stalled = False
     
     try:
         while True:
-            frame = picam2.capture_array()[:, :, :3]
+            started = time.monotonic()
+            try:
+                frame = grabber.get()
+            except queue.Empty:
+                # the grabber keeps retrying, so a stall is waited out; log it once per stall
+                if not stalled:
+                    add_log("Camera stalled; waiting for frames...")
+                    stalled = True
+                continue
+            if stalled:
+                add_log("Camera frames resumed.")
+                stalled = False
             H, W = frame.shape[:2]
             cx, cy = W // 2, H // 2
             rw, rh = int(W * camp.roi_scale), int(H * camp.roi_scale)
             x1, y1, x2, y2 = cx - rw // 2, cy - rh // 2, cx + rw // 2, cy + rh // 2
 
-            _, hsv = camp.preprocess(frame)
-            masks = camp.get_masks(hsv)
-            label, contour, centroid, area, combined_mask = camp.choose_best_contour(
-                (cx, cy), (x1, y1, x2, y2), masks, camp.min_area, 
-                roi_fallback_overlap=not camp.center_only_mode
-            )
-            
-            try:
-                obj_temp = float(state['temperature']['object_temp']) if state['temperature']['object_temp'] != '--' else None
-                ambient_temp = float(state['temperature']['ambient_temp']) if state['temperature']['ambient_temp'] != '--' else None
-                humidity = float(state['temperature']['humidity']) if state['temperature']['humidity'] != '--' else None
-            except (ValueError, TypeError):
-                obj_temp = None
-                ambient_temp = None
-                humidity = None
+            roi = frame[y1:y2, x1:x2]
+            if detection is None or camp.roi_changed(roi, ref_roi):
+                # masks live in `buffers` and are overwritten next pass; detection keeps no reference to them
+                _, hsv = camp.preprocess(roi, out=buffers, need_img=False)
+                masks = camp.get_masks(hsv, out=buffers)
+                # two sparse frames in a row: nothing can pass min_area, skip contouring
+                sparse = camp.mask_too_sparse(camp.mask_preview(masks, out=buffers), camp.min_area)
+                if sparse and was_sparse:
+                    detection = (None, None, None, None, None, None)
+                else:
+                    detection = camp.choose_best_contour(
+                        (cx - x1, cy - y1), (0, 0, x2 - x1, y2 - y1), masks, camp.min_area, 
+                        roi_fallback_overlap=not camp.center_only_mode
+                    )
+                was_sparse = sparse
+                ref_roi = roi
+            label, contour, centroid, area, bbox, combined_mask = detection
 
             if contour is not None and centroid is not None:
                 ccx, ccy = centroid
-                shp = camp.shape_of(contour)
-                bx, by, bw, bh = cv2.boundingRect(contour)
+                shp = camp.shape_of(contour, area, bbox)
+                # only the classifier reads the sensors, so empty frames skip the lookups
+                t = state['temperature_f']
+                obj_temp, ambient_temp, humidity = t['object_temp'], t['ambient_temp'], t['humidity']
                 current_label, current_conf, _ = camp.classify_pen_book_bottle(
-                    color_label=label, shape=shp, area=area, bbox=(bx, by, bw, bh), 
+                    color_label=label, shape=shp, area=area, bbox=bbox, 
                     frame_size=(W, H), contour=contour,
                     obj_temp=obj_temp, ambient_temp=ambient_temp, 
                     humidity=humidity
                 )
-                recent_labels.append((current_label, current_conf))
-                
-                chosen_label, chosen_conf = current_label, current_conf
-                if len(recent_labels) > 0:
-                    counts = {lab: [item[0] for item in recent_labels].count(lab) for lab, _ in recent_labels}
-                    best_lab = max(counts, key=counts.get)
-                    if counts[best_lab] >= camp.SMOOTHING_REQUIRED:
-                        chosen_label = best_lab
+                recent_labels.push(current_label)
+                chosen_label = recent_labels.majority(camp.SMOOTHING_REQUIRED) or current_label
 
                 state['detected_object'] = chosen_label
 
@@ -670,7 +1147,7 @@ def detection_handler():
                     current_mode = "Relax"
                 
                 if current_mode and (current_mode != last_printed_mode or chosen_label != last_known_label):
-                    add_log(f"MODE: {current_mode} (Object: {chosen_label})")
+                    add_log("MODE: %s (Object: %s)", current_mode, chosen_label)
                     last_printed_mode = current_mode
                     last_known_label = chosen_label
                     
@@ -680,13 +1157,27 @@ def detection_handler():
                         activate_relax_mode()
             else:
                 recent_labels.clear()
+                chosen_label = None
 
-            time.sleep(0.5)
+            # back off while the scene is stable, react quickly right after it changes
+            if chosen_label != seen_label:
+                seen_label, stable_frames = chosen_label, 0
+                interval = DETECTION_MIN_INTERVAL
+            else:
+                stable_frames += 1
+                if stable_frames >= DETECTION_STABLE_FRAMES:
+                    interval = min(DETECTION_MAX_INTERVAL, interval * 1.25)
+                elif interval < DETECTION_INTERVAL:
+                    interval = DETECTION_INTERVAL
+            # frame processing time counts against the interval
+            ema_rtt = 0.9 * ema_rtt + 0.1 * (time.monotonic() - started)
+            time.sleep(max(0.0, interval - ema_rtt))
             
     except Exception as e:
-        add_log(f"Detection thread error: {e}")
+        add_log("Detection thread error: %s", e)
         time.sleep(5)
     finally:
+        grabber.stop()
         picam2.stop()
 
 # web page
@@ -917,10 +1408,7 @@ HTML_TEMPLATE = '''
     </div>
 
     <script>
-        function updateUI() {
-            fetch('/api/status')
-                .then(r => r.json())
-                .then(data => {
+        function renderStatus(data) {
                     document.getElementById('detectionMode').textContent = data.detection_mode;
                     document.getElementById('detectedObject').textContent = data.detected_object;
                     document.getElementById('lastGesture').textContent = data.last_gesture || "None";
@@ -928,8 +1416,7 @@ HTML_TEMPLATE = '''
                     document.getElementById('spotifyNowPlaying').textContent = data.spotify_now_playing;
                     document.getElementById('activeDevice').textContent = data.active_device_name || "None";
                     document.getElementById('previousDevice').textContent = data.previous_device_name || "None";
-                    document.getElementById('activePlayer').textContent = 
-                        data.active_mpris_player ? data.active_mpris_player.split('.').pop() : "None";
+                    document.getElementById('activePlayer').textContent = data.active_mpris_player_short || "None";
                     document.getElementById('nowPlaying').textContent = data.now_playing || "N/A";
                     
                     document.getElementById('dhtTemp').textContent = data.temperature.dht_temp + '°C';
@@ -939,7 +1426,12 @@ HTML_TEMPLATE = '''
                     
                     document.getElementById('logs').innerHTML = 
                         data.logs.map(e => `<div>${e}</div>`).join('');
-                });
+        }
+
+        function updateUI() {
+            fetch('/api/status')
+                .then(r => r.json())
+                .then(renderStatus);
         }
 
         function refreshSpotifyDevices() {
@@ -1050,7 +1542,31 @@ HTML_TEMPLATE = '''
                 });
         }
 
-        setInterval(updateUI, 1500);
+        // the server pushes state over /api/events; polling only covers a dropped or missing stream
+        let _poll = null, _events = null;
+        function startUpdates() {
+            if (!window.EventSource) {
+                _poll = setInterval(updateUI, 1500);
+                return;
+            }
+            _events = new EventSource('/api/events');
+            _events.onmessage = e => renderStatus(JSON.parse(e.data));
+            _events.onopen = () => { clearInterval(_poll); _poll = null; };
+            _events.onerror = () => { if (!_poll) _poll = setInterval(updateUI, 1500); };
+        }
+        function stopUpdates() {
+            if (_events) { _events.close(); _events = null; }
+            clearInterval(_poll); _poll = null;
+        }
+        startUpdates();
+        // hidden tabs drop the stream; coming back refreshes once and reconnects
+        document.addEventListener('visibilitychange', () => {
+            stopUpdates();
+            if (document.visibilityState === 'visible') {
+                updateUI();
+                startUpdates();
+            }
+        });
         window.onload = () => {
             updateUI();
             refreshSpotifyDevices();
@@ -1062,13 +1578,49 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
+# the page has no Jinja directives, so it is encoded (and compressed) once and served as-is
+_INDEX_RESPONSE_BODY = HTML_TEMPLATE.encode('utf-8')
+_INDEX_GZ = gzip.compress(_INDEX_RESPONSE_BODY, compresslevel=6)
+
 @app.route('/')
 def index(): 
-    return render_template_string(HTML_TEMPLATE)
+    headers = {'Cache-Control': 'max-age=60', 'Vary': 'Accept-Encoding'}
+    if request.accept_encodings['gzip']:
+        headers['Content-Encoding'] = 'gzip'
+        return Response(_INDEX_GZ, mimetype='text/html', headers=headers)
+    return Response(_INDEX_RESPONSE_BODY, mimetype='text/html', headers=headers)
 
 @app.route('/api/status')
 def api_status(): 
-    return jsonify(state)
+    return Response(status_body(), mimetype='application/json')
+
+def status_body():
+    """The encoded state; callers within the TTL share one encoding unless the state has changed since."""
+    now = time.monotonic()
+    if now - _status_cache['ts'] < STATUS_CACHE_TTL and _status_cache['version'] == state['_version']:
+        return _status_cache['body']
+    version = state['_version']
+    snapshot = {**state, 'logs': format_logs(), 'mpris_players': sorted(state['mpris_players'])}
+    body = orjson.dumps(snapshot, default=list) if ORJSON_AVAILABLE else json.dumps(snapshot).encode('utf-8')
+    _status_cache.update(ts=now, body=body, version=version)
+    return body
+
+@app.route('/api/events')
+def api_events():
+    def stream():
+        version = None
+        while True:
+            with state_changed:
+                changed = state_changed.wait_for(lambda: state['_version'] != version, timeout=EVENTS_KEEPALIVE)
+            if not changed:
+                yield b': keepalive\n\n'
+                continue
+            version = state['_version']
+            yield b'data: ' + status_body() + b'\n\n'
+            # coalesce bursts (log flushes, volume steps) into one event per cache window
+            time.sleep(STATUS_CACHE_TTL)
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/spotify/devices/refresh')
 def api_spotify_devices_refresh():
@@ -1082,18 +1634,19 @@ def api_spotify_devices_refresh():
         state['spotify_devices'] = [{'name': d['name'], 'id': d['id']} for d in devices]
         return jsonify({'devices': state['spotify_devices'], 'selected': state.get('spotify_device_id')})
     except Exception as e:
-        add_log(f"Could not fetch Spotify devices: {e}")
+        add_log("Could not fetch Spotify devices: %s", e)
         return jsonify({'devices': [], 'selected': state.get('spotify_device_id')})
 
 @app.route('/api/spotify/device/select', methods=['POST'])
 def api_spotify_device_select():
     state['spotify_device_id'] = request.json.get('device_id')
     dev_name = next((d['name'] for d in state['spotify_devices'] if d['id'] == state['spotify_device_id']), 'Unknown')
-    add_log(f"Selected Spotify device: {dev_name}")
+    add_log("Selected Spotify device: %s", dev_name)
     return jsonify({'success': True})
 
 @app.route('/api/mpris/players/refresh')
 def api_mpris_players_refresh():
+    invalidate_mpris_cache()
     players = get_all_mpris_players()
     return jsonify({'players': players, 'selected': state.get('active_mpris_player')})
 
@@ -1106,12 +1659,13 @@ def api_mpris_player_select():
     try:
         state['now_playing'] = get_now_playing(player_id)
     except Exception as e:
-        add_log(f"Error updating now playing for selected player: {e}")
-    add_log(f"Selected MPRIS player: {player_id.split('.')[-1]}")
+        add_log("Error updating now playing for selected player: %s", e)
+    add_log("Selected MPRIS player: %s", state['active_mpris_player_short'])
     return jsonify({'success': True})
 
 @app.route('/api/kde/devices/refresh')
 def api_kde_devices_refresh():
+    list_available_devices.cache_clear()
     devices = list_available_devices()
     return jsonify({'devices': devices, 'selected': state.get('active_device_id')})
 
@@ -1121,13 +1675,12 @@ def api_kde_device_select():
     if not device_id:
         return jsonify({'success': False, 'error': 'no device_id provided'}), 400
     
-    devs = list_available_devices()
-    dev_name = next((d['name'] for d in devs if d['id'] == device_id), 'Unknown')
+    dev_name = kde_device_name(device_id) or 'Unknown'
     
     if state.get('active_device_id') and state['active_device_id'] != device_id:
         state['previous_device_id'] = state['active_device_id']
         state['previous_device_name'] = state['active_device_name']
-        add_log(f"Previous device saved: {state['previous_device_name']}")
+        add_log("Previous device saved: %s", state['previous_device_name'])
     
     state.update({
         'active_device_id': device_id,
@@ -1147,7 +1700,7 @@ def api_kde_device_select():
         add_log("No media player found. Start playing music on your device.")
     
     ping_device(device_id, f"Control Active: {dev_name}")
-    add_log(f"KDE Active device set to: {dev_name}")
+    add_log("KDE Active device set to: %s", dev_name)
     return jsonify({'success': True})
 
 @app.route('/api/kde/device/pair', methods=['POST'])
@@ -1159,34 +1712,31 @@ def api_kde_device_pair():
     if not device_id:
         return jsonify({'success': False, 'error': 'device_id required'}), 400
     
-    devs = list_available_devices()
-    dev = next((d for d in devs if d['id'] == device_id), None)
+    dev_name = kde_device_name(device_id)
     
-    if not dev:
+    if not dev_name:
         return jsonify({'success': False, 'error': 'device not found'}), 404
     
-    add_log(f"Pairing with '{dev['name']}'. Please accept on your device.")
-    out, success = run_cmd(f"kdeconnect-cli --pair -d {device_id}", 15)
+    add_log("Pairing with '%s'. Please accept on your device.", dev_name)
+    out, success = run_cmd(['kdeconnect-cli', '--pair', '-d', device_id], 15)
     
     if success and uid and ser_connection:
-        payload = f"[paired]UID={uid};device_id={device_id};device_name={dev['name']}[/paired]\n"
-        ser_connection.write(payload.encode())
-        ser_connection.flush()
+        emit_paired(uid, device_id, dev_name)
         add_log("Pairing info sent to ESP32.")
     
-    return jsonify({'success': success, 'device': dev})
+    return jsonify({'success': success, 'device': {'id': device_id, 'name': dev_name}})
 
 @app.route('/api/kde/clipboard/send', methods=['POST'])
 def api_kde_clipboard_send():
-    if not state['active_device_id']:
+    aid = state['active_device_id']
+    if not aid:
         return jsonify({'success': False, 'message': 'No active device'}), 400
     
     content = get_clipboard_content()
-    short = (content[:40] + "...") if len(content) > 40 else content
     if not content:
         return jsonify({'success': False, 'message': 'Clipboard is empty'}), 400
     
-    success = share_clipboard_to_device(state['active_device_id'], content)
+    success = share_clipboard_to_device(aid, content)
     return jsonify({
         'success': success, 
         'message': f"Clipboard sent: {content}" if success else 'Failed to send clipboard'
@@ -1194,7 +1744,8 @@ def api_kde_clipboard_send():
 
 @app.route('/api/kde/file/send', methods=['POST'])
 def api_kde_file_send():
-    if not state['active_device_id']:
+    aid = state['active_device_id']
+    if not aid:
         return jsonify({'success': False, 'message': 'No active device'}), 400
     
     if 'file' not in request.files:
@@ -1205,11 +1756,14 @@ def api_kde_file_send():
         return jsonify({'success': False, 'message': 'No file selected'}), 400
     
     try:
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, file.filename)
-        file.save(temp_path)
+        temp_dir = SHARE_TMP_DIR or tempfile.gettempdir()
+        temp_path = os.path.join(temp_dir, os.path.basename(file.filename))
+        # Werkzeug has already spooled the upload (in memory or to its own temp file), so this does
+        # not bound memory; it only copies that spool out in 1 MB chunks instead of 16 KB ones
+        with open(temp_path, 'wb') as fh:
+            shutil.copyfileobj(file.stream, fh, length=1024 * 1024)
 
-        success = share_file_to_device(state['active_device_id'], temp_path)
+        success = share_file_to_device(aid, temp_path)
 
         try:
             os.unlink(temp_path)
@@ -1221,7 +1775,7 @@ def api_kde_file_send():
             'message': f'File sent: {file.filename}' if success else 'Failed to send file'
         })
     except Exception as e:
-        add_log(f"Error in file upload: {e}")
+        add_log("Error in file upload: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/notifications/toggle', methods=['POST'])
@@ -1231,10 +1785,10 @@ def api_notifications_toggle():
     new_state = not notifications_muted
     toggle_notifications_muted(new_state)
 
-    if state['active_device_id']:
-        ping_device(state['active_device_id'], 
-                   f"Notifications {'Muted' if new_state else 'Unmuted'}")
-        send_media_key(state['active_device_id'], 'mute')
+    aid = state['active_device_id']
+    if aid:
+        ping_device(aid, f"Notifications {'Muted' if new_state else 'Unmuted'}")
+        send_media_key(aid, 'mute')
     
     return jsonify({'success': True, 'muted': notifications_muted})
 
@@ -1242,33 +1796,46 @@ def api_notifications_toggle():
 def parse_message_body(body):
     result = {}
     for pair in body.split(';'):
-        if '=' in pair:
-            key, value = pair.split('=', 1)
+        # partition scans each pair once, where the '=' test plus split('=', 1) scanned it twice
+        key, eq, value = pair.partition('=')
+        if eq:
             result[key.strip()] = value.strip()
     return result
 
-def parse_temp_block(lines):
-    result = {}
-    for line in lines:
-        line = line.strip()
-        if '=' in line:
-            key, value = line.split('=', 1)
-            key = key.strip().upper()
-            value = value.strip()
-
-            if key in ['DHT', 'DHT_TEMP']:
-                result['dht_temp'] = value
-            elif key in ['HUM', 'HUMIDITY']:
-                result['humidity'] = value
-            elif key in ['AMB', 'AMBIENT', 'AMBIENT_TEMP']:
-                result['ambient_temp'] = value
-            elif key in ['OBJ', 'OBJECT', 'OBJECT_TEMP']:
-                result['object_temp'] = value
-    
-    return result
+_TEMP_KEYS = {
+    'DHT': 'dht_temp', 'DHT_TEMP': 'dht_temp',
+    'HUM': 'humidity', 'HUMIDITY': 'humidity',
+    'AMB': 'ambient_temp', 'AMBIENT': 'ambient_temp', 'AMBIENT_TEMP': 'ambient_temp',
+    'OBJ': 'object_temp', 'OBJECT': 'object_temp', 'OBJECT_TEMP': 'object_temp',
+}
 
-def handle_register(uid, ser):
-    add_log(f"New Tag Registration Request (UID: {uid})")
+def _apply_kv_line(line, out):
+    """Stores one TEMP 'KEY=value' line in `out` under its canonical name; other lines are ignored."""
+    eq = line.find('=')
+    if eq == -1:
+        return
+    target = _TEMP_KEYS.get(line[:eq].strip().upper())
+    if target:
+        out[target] = line[eq + 1:].strip()
+
+def update_temperature(temp_data):
+    """Stores the display strings and their float values, parsed once per TEMP block."""
+    state['temperature'].update(temp_data)
+    for key, value in temp_data.items():
+        try:
+            state['temperature_f'][key] = float(value)
+        except ValueError:
+            state['temperature_f'][key] = None
+    state.touch()
+
+def emit_paired(uid, device_id, device_name):
+    """Queues the [paired] reply; join sizes the buffer from the parts, then copies once."""
+    serial_tx.put(b''.join((b'[paired]UID=', str(uid).encode(), b';device_id=', device_id.encode(),
+                            b';device_name=', device_name.encode(), b'[/paired]\n')))
+
+def handle_register(uid):
+    add_log("New Tag Registration Request (UID: %s)", uid)
+    # ttl_cache'd for 5 s, so a quick retry of the prompt reuses the last listing
     devices = list_available_devices()
     
     if not devices:
@@ -1286,24 +1853,22 @@ def handle_register(uid, ser):
             return
 
         dev = devices[int(choice) - 1]
-        add_log(f"Pairing with '{dev['name']}'. Please accept on your device.")
-        run_cmd(f"kdeconnect-cli --pair -d {dev['id']}", 15)
+        add_log("Pairing with '%s'. Please accept on your device.", dev['name'])
+        run_cmd(['kdeconnect-cli', '--pair', '-d', dev['id']], 15)
 
-        payload = f"[paired]UID={uid};device_id={dev['id']};device_name={dev['name']}[/paired]\n"
-        ser.write(payload.encode())
-        ser.flush()
+        emit_paired(uid, dev['id'], dev['name'])
         add_log("Pairing info sent to ESP32.")
 
     except (KeyboardInterrupt, EOFError):
         print("\nCanceled by user.")
 
 def handle_detected(uid, device_id, device_name):
-    add_log(f"Tag Detected: {device_name} (UID: {uid})")
+    add_log("Tag Detected: %s (UID: %s)", device_name, uid)
 
     if state['active_device_id'] and state['active_device_id'] != device_id:
         state['previous_device_id'] = state['active_device_id']
         state['previous_device_name'] = state['active_device_name']
-        add_log(f"Previous device saved: {state['previous_device_name']}")
+        add_log("Previous device saved: %s", state['previous_device_name'])
 
     state.update({
         'active_device_id': device_id,
@@ -1312,21 +1877,31 @@ def handle_detected(uid, device_id, device_name):
 
     state['active_mpris_player'] = find_mpris_player_for_device(device_id)
 
-    if not state['active_mpris_player']:
-        add_log("Retrying player detection without device matching...")
-        time.sleep(0.5)
-        state['active_mpris_player'] = find_mpris_player_for_device()
-
     if state['active_mpris_player']:
         state['now_playing'] = get_now_playing(state['active_mpris_player'])
     else:
+        # the retry waits for the player to show up; keep that sleep off the serial path
         state['now_playing'] = "N/A"
-        add_log("No media player found. Start playing music on your device.")
+        threading.Thread(target=_mpris_retry, args=(device_id,), daemon=True).start()
 
     ping_device(device_id, f"Control Active: {device_name}")
 
+def _mpris_retry(device_id):
+    add_log("Retrying player detection without device matching...")
+    time.sleep(0.5)
+    player = find_mpris_player_for_device()
+    # a later tag may have taken over while this one slept
+    if state['active_device_id'] != device_id:
+        return
+    state['active_mpris_player'] = player
+    if player:
+        state['now_playing'] = get_now_playing(player)
+    else:
+        state['now_playing'] = "N/A"
+        add_log("No media player found. Start playing music on your device.")
+
 def handle_removed(device_name):
-    add_log(f"Tag Removed: {device_name}. Deactivating controls.")
+    add_log("Tag Removed: %s. Deactivating controls.", device_name)
     if state.get('active_device_id'):
         ping_device(state['active_device_id'], "Session Ended")
     state.update({
@@ -1334,8 +1909,82 @@ def handle_removed(device_name):
         'active_mpris_player': None, 'now_playing': "N/A"
     })
 
+def handle_serial_line(line, ser):
+    """Handles one stripped line as bytes; only the parts a handler reads get decoded."""
+    # one C-level match classifies the opening tag; TEMP framing is a two-state machine
+    # whose tags are sliced off
+    m = _TAG_RE.match(line)
+    tag = m.group(1) if m else None
+    mode = serial_buffer['mode']
+    if tag == TAG_TEMP:
+        serial_buffer['temp_data'].clear()
+        line = line[LEN_TEMP_OPEN:]
+        mode = serial_buffer['mode'] = TEMP_IN
+    if mode == TEMP_IN:
+        _rx_temp_line(line)
+        return
+    
+    if _LOG_RX and line.startswith(b'[') and next(_RX_COUNTER) % LOG_RX_EVERY == 0:
+        add_log("RX: %s", line.decode('utf-8', errors='ignore'))
+
+    entry = SERIAL_HANDLERS.get(tag)
+    if entry:
+        handler, close_len = entry
+        handler(line[m.end():-close_len].decode('utf-8', errors='ignore'), ser)
+
+def _rx_temp_line(line):
+    # each line is parsed as it arrives; the close tag publishes the whole block at once
+    done = line.endswith(TEMP_CLOSE)
+    if done:
+        line = line[:-LEN_TEMP_CLOSE]
+    # fields come one per line or ';'-separated on a single [TEMP]...[/TEMP] line
+    out = serial_buffer['temp_data']
+    for field in line.decode('ascii', errors='ignore').split(';'):
+        _apply_kv_line(field, out)
+    if done:
+        serial_buffer['mode'] = TEMP_NORMAL
+        update_temperature(serial_buffer['temp_data'])
+
+def _rx_register(body, ser):
+    # input() would stall the reader and let the ESP32's output pile up, so prompt on a thread;
+    # one prompt at a time since they share the terminal
+    if not register_prompt_lock.acquire(blocking=False):
+        add_log("Registration prompt already open; ignoring new request.")
+        return
+    uid = parse_message_body(body).get('UID')
+
+    def prompt():
+        try:
+            handle_register(uid)
+        finally:
+            register_prompt_lock.release()
+    threading.Thread(target=prompt, daemon=True).start()
+
+def _rx_detected(body, ser):
+    items = parse_message_body(body)
+    handle_detected(items.get('UID'), items.get('device_id'), items.get('device_name'))
+
+def _rx_removed(body, ser):
+    handle_removed(parse_message_body(body).get('device_name'))
+
+def _rx_gesture(body, ser):
+    gesture_data = parse_message_body(body)
+    # a garbled id is just an unknown gesture, not an exception (and the serial loop's 1 s error pause);
+    # volume_change stays a string, _parse_volume_delta is the one place that parses it
+    raw_id = gesture_data.get('Gesture_id', '0')
+    gesture_id = int(raw_id) if raw_id.isdigit() else 0
+    perform_gesture_action(gesture_id, gesture_data)
+
+# tag -> (handler, length of the closing "[/tag]")
+SERIAL_HANDLERS = {tag: (handler, len(tag) + 3) for tag, handler in (
+    (TAG_REGISTER, _rx_register),
+    (TAG_DETECTED, _rx_detected),
+    (TAG_REMOVED, _rx_removed),
+    (TAG_GESTURE, _rx_gesture),
+)}
+
 def serial_handler():
-    global ser_connection, serial_buffer
+    global ser_connection
     
     try:
         with serial.Serial(SERIAL_PORT, BAUD, timeout=TIMEOUT) as ser:
@@ -1345,124 +1994,105 @@ def serial_handler():
             add_log("Serial connected. Listening for events...")
             state['status'] = 'Connected'
 
+            # readline() costs a syscall per byte; take whatever is waiting and split complete lines here.
+            # Handlers run on serial_dispatcher, so a slow one never stops this loop draining the port
+            buf = bytearray()
             while True:
                 try:
-                    line = ser.readline().decode('utf-8', errors='ignore').strip()
-                    if not line:
+                    chunk = ser.read(ser.in_waiting or 1)
+                    if not chunk:
                         continue
-
-                    if line.startswith("[TEMP]") or line == "[TEMP]":
-                        serial_buffer['in_temp_block'] = True
-                        serial_buffer['temp_lines'] = []
-
-                        if "[/TEMP]" in line:
-                            content = line.replace("[TEMP]", "").replace("[/TEMP]", "").strip()
-                            if content:
-                                serial_buffer['temp_lines'].append(content)
-
-                            temp_data = parse_temp_block(serial_buffer['temp_lines'])
-                            state['temperature'].update(temp_data)
-                            serial_buffer['in_temp_block'] = False
-                            serial_buffer['temp_lines'] = []
+                    buf += chunk
+                    # cut every complete line off in one go and tokenize with split() at C speed;
+                    # the partial tail stays in buf for the next read
+                    nl = buf.rfind(b'\n')
+                    if nl == -1:
                         continue
-                    
-                    if serial_buffer['in_temp_block']:
-                        if line.endswith("[/TEMP]") or line == "[/TEMP]":
-                            serial_buffer['in_temp_block'] = False
-                            content = line.replace("[/TEMP]", "").strip()
-                            if content:
-                                serial_buffer['temp_lines'].append(content)
-                            
-                            temp_data = parse_temp_block(serial_buffer['temp_lines'])
-                            state['temperature'].update(temp_data)
-                            serial_buffer['temp_lines'] = []
-                        else:
-                            if line: 
-                                serial_buffer['temp_lines'].append(line)
-                        continue
-                    
-                    if line.startswith('[') and not line.startswith('[TEMP]'):
-                        add_log(f"RX: {line}")
-
-                    if line.startswith("[register]"):
-                        items = parse_message_body(line[10:-11])
-                        handle_register(items.get('UID'), ser)
-                    
-                    elif line.startswith("[detected]"):
-                        items = parse_message_body(line[10:-11])
-                        handle_detected(
-                            items.get('UID'), 
-                            items.get('device_id'), 
-                            items.get('device_name')
-                        )
-
-                    elif line.startswith("[removed]"):
-                        items = parse_message_body(line[9:-10])
-                        handle_removed(items.get('device_name'))
-
-                    elif line.startswith("[Gesture]"):
-                        gesture_body = line[9:-10]  
-                        gesture_data = parse_message_body(gesture_body)
-                        
-                        gesture_id = int(gesture_data.get('Gesture_id', 0))
-                        
-                        volume_change = gesture_data.get('volume_change')
-                        if volume_change:
-                            try:
-                                gesture_data['volume_change'] = float(volume_change)
-                            except (ValueError, TypeError):
-                                pass
-                        
-                        perform_gesture_action(gesture_id, gesture_data)
+                    complete = bytes(buf[:nl])
+                    del buf[:nl + 1]
+                    for line in complete.split(b'\n'):
+                        line = line.strip()
+                        if line:
+                            serial_lines.put((line, ser))
 
                 except (KeyboardInterrupt, SystemExit):
                     break
                 except serial.SerialException as e:
-                    add_log(f"Serial exception: {e}")
+                    add_log("Serial exception: %s", e)
                     break
                 except Exception as e:
-                    add_log(f"Serial loop error: {e}")
+                    add_log("Serial loop error: %s", e)
                     time.sleep(1)
 
     except serial.SerialException as e:
-        add_log(f"CRITICAL Serial error: {e}")
+        add_log("CRITICAL Serial error: %s", e)
         state['status'] = 'Serial Error'
 
+def serial_writer():
+    """Writes whatever has queued on serial_tx since the last pass as one write and one flush."""
+    while True:
+        chunks = [serial_tx.get()]
+        while True:
+            try:
+                chunks.append(serial_tx.get_nowait())
+            except queue.Empty:
+                break
+        ser = ser_connection
+        if ser is None:
+            add_log("Serial not connected; dropped outbound message.")
+            continue
+        try:
+            ser.write(b''.join(chunks))
+            ser.flush()
+        except serial.SerialException as e:
+            add_log("Serial write error: %s", e)
+
+def serial_dispatcher():
+    """Runs handle_serial_line for each line serial_handler reads, in arrival order."""
+    while True:
+        line, ser = serial_lines.get()
+        try:
+            handle_serial_line(line, ser)
+        except Exception as e:
+            add_log("Serial handler error: %s", e)
+
 # main function
 def main():
     print("="*70)
     print("Multimodal Control Hub v3.0 Started")
     print("="*70)
     
-    detect_qdbus()
-    if not run_cmd("kdeconnect-cli --version")[1]:
+    init_dbus()
+    startup = ThreadPoolExecutor(max_workers=2)
+    qdbus_ready = startup.submit(detect_qdbus)
+    if not run_cmd(['kdeconnect-cli', '--version'])[1]:
         print("ERROR: KDE Connect not found! Please install it.")
         print("  Ubuntu/Debian: sudo apt-get install kdeconnect")
         sys.exit(1)
     
-    has_wl = run_cmd("wl-paste --version", timeout=2)[1]
-    has_xclip = run_cmd("xclip -version", timeout=2)[1]
-    has_xsel = run_cmd("xsel --version", timeout=2)[1]
+    if HEADLESS:
+        add_log("Running in HEADLESS mode")
+    spotify_ready = startup.submit(init_spotify)
     
-    if not (has_wl or has_xclip or has_xsel):
+    if not _CLIPBOARD_CMD:
         print("WARNING: No clipboard tool found. Clipboard sharing will not work.")
         print("  For Wayland: sudo apt-get install wl-clipboard")
         print("  For X11: sudo apt-get install xclip")
+    elif _CLIPBOARD_CMD[0] == 'wl-paste':
+        print("✓ Clipboard: wl-clipboard (Wayland) detected")
     else:
-        if has_wl:
-            print("✓ Clipboard: wl-clipboard (Wayland) detected")
-        elif has_xclip:
-            print("✓ Clipboard: xclip (X11) detected")
-        elif has_xsel:
-            print("✓ Clipboard: xsel (X11) detected")
+        print(f"✓ Clipboard: {_CLIPBOARD_CMD[0]} (X11) detected")
     
     print("\nRunning KDE Connect diagnostics...")
     diagnose_kde_connect()
 
-    if HEADLESS:
-        add_log("Running in HEADLESS mode")
-    init_spotify()
+    qdbus_ready.result()
+    spotify_ready.result()
+    startup.shutdown()
     
+    threading.Thread(target=spotify_worker, daemon=True).start()
+    threading.Thread(target=serial_dispatcher, daemon=True).start()
+    threading.Thread(target=serial_writer, daemon=True).start()
     threading.Thread(target=serial_handler, daemon=True).start()
     
     if DETECTION_AVAILABLE:
@@ -1471,7 +2101,7 @@ def main():
         add_log("Object detection disabled")
     
     try:
-        ip = run_cmd("hostname -I")[0].split()[0]
+        ip = run_cmd(['hostname', '-I'])[0].split()[0]
     except:
         ip = "localhost"
     